@@ -0,0 +1,74 @@
+# agents/followup_context.py
+from tools.local_llm import local_llm_chain_ask, count_tokens, PRIORITY_INTERACTIVE
+
+FOLLOWUP_TOKEN_BUDGET = 2000   # prompt size limit for a follow-up answer
+RECENT_MESSAGES = 6            # latest history messages always kept verbatim
+FOLD_BATCH = 4                 # older messages are folded into the summary this many at a time
+
+ROLLING_SUMMARY_PROMPT_TEMPLATE = """
+You are keeping a running summary of a conversation about fact-checking a claim.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Rewrite the summary so it also covers the new messages. Keep the facts, verdicts and open questions, in at most 150 words.
+"""
+
+
+def _format_messages(messages) -> str:
+    return "".join(f"{h['role'].capitalize()}: {h['content']}\n" for h in messages)
+
+
+def update_rolling_summary(session):
+    """
+    Fold history messages that fell out of the verbatim window into session["rolling_summary"].
+    Runs only once FOLD_BATCH such messages have accumulated, so most questions skip it.
+    """
+    history = session.get("history", [])
+    folded = session.get("summarized_count", 0)
+    fold_until = len(history) - RECENT_MESSAGES
+    if fold_until - folded < FOLD_BATCH:
+        return
+
+    session["rolling_summary"] = local_llm_chain_ask(
+        prompt_text="",
+        template=ROLLING_SUMMARY_PROMPT_TEMPLATE.format(
+            summary=session.get("rolling_summary") or "(empty)",
+            messages=_format_messages(history[folded:fold_until])
+        ),
+        priority=PRIORITY_INTERACTIVE
+    ).strip()
+    session["summarized_count"] = fold_until
+
+
+def build_followup_prompt(session, question: str, claim: str, past_context: str) -> str:
+    """
+    Build the follow-up prompt within FOLLOWUP_TOKEN_BUDGET: the rolling summary of older
+    turns, the messages not yet summarized, and as much past evidence as still fits.
+    """
+    update_rolling_summary(session)
+    history = session.get("history", [])
+    recent = history[session.get("summarized_count", 0):]
+    summary = session.get("rolling_summary")
+
+    head = f"Claim: {claim}\n\n"
+    tail = "Conversation history:\n"
+    if summary:
+        tail += f"Summary of earlier conversation: {summary}\n"
+    question_part = f"\nUser: {question}\nAssistant:"
+
+    # Drop the oldest unsummarized messages first, but always keep the last exchange
+    while len(recent) > 2 and count_tokens(head + tail + _format_messages(recent) + question_part) > FOLLOWUP_TOKEN_BUDGET:
+        recent = recent[1:]
+    tail += _format_messages(recent) + question_part
+
+    # Past evidence gets whatever budget is left
+    remaining = FOLLOWUP_TOKEN_BUDGET - count_tokens(head + tail) - count_tokens("Relevant past facts:\n\n\n")
+    if count_tokens(past_context) > remaining:
+        cut = past_context[:max(0, remaining) * 4].rsplit("\n", 1)[0]
+        past_context = cut + "\n[...]" if cut.strip() else "[omitted to fit the context budget]"
+
+    return head + f"Relevant past facts:\n{past_context}\n\n" + tail
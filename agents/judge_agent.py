@@ -1,6 +1,11 @@
-from tools.local_llm import local_llm_chain_ask
+import re
+
+from tools.local_llm import local_llm_chain_ask, count_tokens
 from tools.scrape_url import extract_percentage
 
+# Prompt size limit for a batched judgment, in tokens
+BATCH_TOKEN_BUDGET = 3000
+
 JUDGE_PROMPT_TEMPLATE = """
 You are a reliable fact-checking AI.
 
@@ -26,29 +31,154 @@ Claim: "{claim}"
 Article Summary: "{summary}"
 """
 
-def judge_claim_against_summary(claim: str, summary: str) -> dict:
-    """Runs the judgment LLM and parses its response into a dict."""
+BATCH_JUDGE_PROMPT_TEMPLATE = """
+You are a reliable fact-checking AI.
+
+You will receive:
+- A claim to evaluate.
+- Summaries of {count} source articles, numbered [1] to [{count}].
+
+For EACH source, analyze its summary on its own and determine if it:
+1. **Supports** the claim
+2. **Refutes** the claim
+3. Is **Neutral** or **Inconclusive**
+
+Then explain your reasoning and provide a confidence score from 0 to 100 (without the % symbol).
+
+Respond with exactly one block per source, in order, **exactly** in this format:
+---
+Source: [number]
+Verdict: [Supports / Refutes / Neutral]
+Confidence: [0-100]
+Reason: [short explanation]
+---
+
+Claim: "{claim}"
+
+{sources}
+"""
+
+_SOURCE_LINE = re.compile(r"^[\s*#\[]*source[\s*\]]*:?[\s*\[]*(\d+)", re.IGNORECASE | re.MULTILINE)
+
+
+def parse_judgment(raw_output: str) -> dict:
+    """Parses a Verdict/Confidence/Reason block into a dict; raises if a field is missing."""
+    lines = [line.replace("*", "").strip() for line in raw_output.splitlines() if line.strip()]
+    verdict_line = next(line for line in lines if line.startswith("Verdict:"))
+    confidence_line = next(line for line in lines if line.startswith("Confidence:"))
+    reason_line = next(line for line in lines if line.startswith("Reason:"))
+
+    return {
+        "verdict": verdict_line.split(":", 1)[1].strip(),
+        "confidence": extract_percentage(confidence_line.split(":", 1)[1].strip()),
+        "reason": reason_line.split(":", 1)[1].strip(),
+        "raw": raw_output
+    }
+
+
+class JudgmentStream:
+    """Forwards streamed judge output to `on_token`, dropping separator and Confidence lines."""
+    DROPPED_PREFIXES = ("---", "Confidence")
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self.pending = ""      # start of a line we can't classify yet
+        self.keep_line = None  # decision for the current line, None until known
+        self.forwarded = False
+
+    def _send(self, text):
+        if text:
+            self.on_token(text)
+            self.forwarded = True
+
+    def feed(self, chunk: str):
+        for piece in chunk.splitlines(keepends=True):
+            if self.keep_line is None:
+                self.pending += piece
+                head = self.pending.lstrip().replace("*", "")
+                if not head.endswith("\n") and len(head) < max(map(len, self.DROPPED_PREFIXES)):
+                    continue
+                self.keep_line = bool(head.strip()) and not head.startswith(self.DROPPED_PREFIXES)
+                piece, self.pending = self.pending.lstrip(), ""
+            if self.keep_line:
+                self._send(piece)
+            if piece.endswith("\n"):
+                self.keep_line = None
+
+    def close(self):
+        head = self.pending.strip()
+        if head and not head.replace("*", "").startswith(self.DROPPED_PREFIXES):
+            self._send(head)
+        self.pending = ""
+
+
+def judge_claim_against_summary(claim: str, summary: str, on_token=None, cancel=None) -> dict:
+    """
+    Runs the judgment LLM and parses its response into a dict.
+    When `on_token` is given, the verdict and reason are streamed to it as they are generated.
+    """
+    judgment_stream = JudgmentStream(on_token) if on_token else None
     raw_output = local_llm_chain_ask(
         prompt_text="",
-        template=JUDGE_PROMPT_TEMPLATE.format(claim=claim, summary=summary)
+        template=JUDGE_PROMPT_TEMPLATE.format(claim=claim, summary=summary),
+        on_token=judgment_stream.feed if judgment_stream else None,
+        cancel=cancel
     )
+    if judgment_stream:
+        judgment_stream.close()
 
     try:
-        lines = [line.strip() for line in raw_output.splitlines() if line.strip()]
-        verdict_line = next(line for line in lines if line.startswith("Verdict:"))
-        confidence_line = next(line for line in lines if line.startswith("Confidence:"))
-        reason_line = next(line for line in lines if line.startswith("Reason:"))
-
-        return {
-            "verdict": verdict_line.split(":", 1)[1].strip(),
-            "confidence": extract_percentage(confidence_line.split(":", 1)[1].strip()),
-            "reason": reason_line.split(":", 1)[1].strip(),
-            "raw": raw_output
-        }
+        return parse_judgment(raw_output)
     except Exception as e:
         return {
             "verdict": "Neutral",
             "confidence": 0,
             "reason": f"Failed to parse judgment: {str(e)}",
             "raw": raw_output
-        }
\ No newline at end of file
+        }
+
+
+def parse_batch_judgments(raw_output: str, count: int) -> dict:
+    """Parses a batched answer into {source index (0-based): judgment} for the blocks that parse."""
+    matches = list(_SOURCE_LINE.finditer(raw_output))
+    parsed = {}
+    for pos, match in enumerate(matches):
+        index = int(match.group(1)) - 1
+        end = matches[pos + 1].start() if pos + 1 < len(matches) else len(raw_output)
+        if not 0 <= index < count or index in parsed:
+            continue
+        try:
+            parsed[index] = parse_judgment(raw_output[match.end():end])
+        except StopIteration:
+            continue
+    return parsed
+
+
+def judge_claim_against_summaries(claim: str, summaries: list, cancel=None) -> list:
+    """
+    Judges several summaries of the same claim with one LLM call.
+
+    Falls back to judge_claim_against_summary for every source whose block is missing
+    or unparsable, and for the whole list when the prompt would exceed BATCH_TOKEN_BUDGET.
+    """
+    if not summaries:
+        return []
+    if len(summaries) == 1:
+        return [judge_claim_against_summary(claim, summaries[0], cancel=cancel)]
+
+    sources = "\n\n".join(
+        f"[{i + 1}] Article Summary: \"{summary}\"" for i, summary in enumerate(summaries)
+    )
+    prompt = BATCH_JUDGE_PROMPT_TEMPLATE.format(claim=claim, count=len(summaries), sources=sources)
+    if count_tokens(prompt) > BATCH_TOKEN_BUDGET:
+        return [judge_claim_against_summary(claim, summary, cancel=cancel) for summary in summaries]
+
+    raw_output = local_llm_chain_ask(prompt_text="", template=prompt, cancel=cancel)
+    parsed = parse_batch_judgments(raw_output, len(summaries))
+    if len(parsed) < len(summaries):
+        print(f"Batched judgment parsed {len(parsed)}/{len(summaries)} sources, judging the rest one by one")
+
+    return [
+        parsed[i] if i in parsed else judge_claim_against_summary(claim, summary, cancel=cancel)
+        for i, summary in enumerate(summaries)
+    ]
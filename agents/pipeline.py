@@ -1,120 +1,631 @@
 from agents.reader_agent import summarize_url
-from agents.judge_agent import judge_claim_against_summary
+from agents.judge_agent import judge_claim_against_summary, judge_claim_against_summaries
 from agents.research_agent import run_research_agent
-from tools.local_llm import local_llm_chain_ask
+from agents.followup_context import build_followup_prompt
+from tools.local_llm import local_llm_stream, PRIORITY_INTERACTIVE
 from collections import Counter
-from retriever.vector_store import store_fact_check, search_similar_claims, format_results
+from retriever.vector_store import store_fact_checks, search_similar_claims, format_results, find_stored_verdicts
 from tools.scrape_url import extract_percentage, scrape_url
+from tools.fetch_sources import iter_fetch
+from tools.passage_select import select_passages
+from tools.telemetry import Trace, sources_skipped, span
+from tools.cancel import CancelToken, Cancelled
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import hashlib
+import itertools
 import queue
 import threading
+import time
 
+SOURCE_WORKERS = 4  # sources summarized and judged in parallel per claim
+BATCH_JUDGE = False  # judge all summaries of a claim in one LLM call once they are ready
+STREAM_TOKENS = True  # stream summaries and judgments token by token as the LLM produces them
+BATCH_CLAIM_WORKERS = 3  # claims of a batch checked in parallel
+SELECT_PASSAGES = True  # send only the claim-relevant passages of a page to the reader agent
+EXTRACT_MAX_CHARS = 20000  # page text extracted for passage selection (4000 without it)
 
-def aggregate_final_verdict(results):
-    verdicts = [r["verdict"] for r in results]
-    counter = Counter(verdicts)
-    majority = counter.most_common(1)[0]
+# Answer repeat claims from stored verdicts instead of re-running the pipeline. Off by default:
+# MiniLM similarity can't tell every paraphrase from a reversal, beyond the negation check
+MEMORY_FAST_PATH = False
+MEMORY_SIMILARITY_THRESHOLD = 0.9   # cosine similarity between the new and stored claim
+MEMORY_MAX_AGE = 7 * 24 * 3600      # seconds a stored verdict stays usable
+MEMORY_MIN_SOURCES = 2              # stored judgments needed to skip the web search
 
-    final_verdict =  f"Final Verdict for claim: {majority[0]}\n" + \
+HEARTBEAT_INTERVAL = 15   # seconds of silence before a heartbeat event is sent
+REQUEST_DEADLINE = 300    # seconds a fact-check may run before its remaining work is cancelled
+
+# Verdict aggregation
+VERDICTS = ("Supports", "Refutes", "Neutral")
+WEIGHT_BY_CONFIDENCE = True   # a judgment counts as its confidence / 100 instead of one vote
+EARLY_STOP = False            # stop summarizing and judging once the other sources can't change the verdict
+EARLY_STOP_MIN_JUDGED = 3     # judgments needed before the verdict may be called settled
+
+
+class StreamFloor:
+    """
+    Serializes concurrent messages onto one text stream.
+
+    Messages are written piece by piece under a key. The first open message streams live;
+    the others are buffered and flushed, in arrival order, once the floor frees up, so
+    tokens from different sources never interleave.
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.lock = threading.Lock()
+        self.owner = None
+        self.buffers = {}
+        self.closed = set()
+        self.keys = itertools.count()
+
+    def write(self, key, text):
+        with self.lock:
+            if self.owner is None and not self.buffers:
+                self.owner = key
+            if self.owner == key:
+                self.emit(text)
+            else:
+                self.buffers.setdefault(key, []).append(text)
+
+    def close(self, key):
+        with self.lock:
+            if self.owner != key:
+                self.closed.add(key)
+                return
+            self.owner = None
+            while self.buffers:
+                next_key = next(iter(self.buffers))
+                for text in self.buffers.pop(next_key):
+                    self.emit(text)
+                if next_key in self.closed:
+                    self.closed.discard(next_key)
+                    continue
+                self.owner = next_key
+                return
+
+    def message(self, text):
+        key = ("message", next(self.keys))
+        self.write(key, text)
+        self.close(key)
+
+
+class SharedWork:
+    """
+    Runs each keyed piece of work once and shares the result with every caller,
+    including callers that arrive while it is still in flight. Used to fetch a URL once
+    across all claims of a batch, and to summarize it once per distinct text handed to the
+    reader agent (passages are selected per claim, so long pages may differ by claim).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.futures = {}
+
+    def once(self, key, fn):
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if owner:
+                future = self.futures[key] = Future()
+        if owner:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def judgment_weight(result) -> float:
+    """
+    How much one judgment counts: its confidence as a fraction, or 1 without one.
+    """
+    confidence = result.get("confidence")
+    if not WEIGHT_BY_CONFIDENCE or confidence is None:
+        return 1.0
+    try:
+        return min(max(float(confidence), 0.0), 100.0) / 100
+    except (TypeError, ValueError):
+        return 1.0
+
+def verdict_scores(results) -> dict:
+    scores = dict.fromkeys(VERDICTS, 0.0)
+    for r in results:
+        if r["verdict"] in scores:
+            scores[r["verdict"]] += judgment_weight(r)
+    return scores
+
+def weighted_verdict(results) -> str:
+    """
+    The verdict with the highest confidence-weighted score; a tie at the top is Neutral.
+    """
+    scores = verdict_scores(results)
+    best = max(scores.values())
+    if best <= 0:
+        return "Inconclusive"
+    leaders = [verdict for verdict, score in scores.items() if score == best]
+    return leaders[0] if len(leaders) == 1 else "Neutral"
+
+def verdict_settled(results, remaining: int) -> bool:
+    """
+    True once `remaining` more judgments, each worth at most 1, can't change the verdict.
+    """
+    if len(results) < EARLY_STOP_MIN_JUDGED:
+        return False
+    ranked = sorted(verdict_scores(results).values(), reverse=True)
+    return ranked[0] - ranked[1] > remaining
+
+def aggregate_final_verdict(results, sources_found: int = None, stopped_early: bool = False):
+    if not results:
+        return "Final Verdict for claim: Inconclusive\nNo usable sources could be evaluated\n"
+
+    counter = Counter(r["verdict"] for r in results)
+    scores = verdict_scores(results)
+
+    final_verdict =  f"Final Verdict for claim: {weighted_verdict(results)}\n" + \
             f"{counter.get('Supports', 0)} articles support claim\n" + \
             f"{counter.get('Refutes', 0)} articles Refutes claim\n" + \
             f"{counter.get('Neutral', 0)} articles take Neutral stand for claim\n" + \
             f"Total articles refered : {len(results)}\n"
+    if WEIGHT_BY_CONFIDENCE:
+        final_verdict += "Confidence-weighted score : " + \
+            ", ".join(f"{verdict} {score:.2f}" for verdict, score in scores.items()) + "\n"
+    if sources_found is not None:
+        final_verdict += f"Sources evaluated : {len(results)} of {sources_found}" + \
+            (" (stopped early, verdict settled)" if stopped_early else "") + "\n"
     return final_verdict
 
-def run_fact_check_stream(claim: str, session_id: str):
-    output_queue = queue.Queue()
-    summary= []
-    sources = run_research_agent(claim)
-    print(f"Searching web for: {claim}")
-    output_queue.put(f"🌐 Searching web for: {claim}\n")
-    sources = run_research_agent(claim)
-
-    def stream_resources():
-        for src in sources:
-            print(f"Checking accessibility: {src['url']}")
-            raw_text = scrape_url(src['url'])
-            if raw_text.strip():
-                output_queue.put(f"✔️ Found source: {src['url']}\n")
-            else:
-                output_queue.put(f"Skipping source (unreachable or empty): {src['url']}\n")
-    stream_resources()
-    output_queue.put(f"\n\n🧠 Summarizing all resources : \n")
+def verdict_counts(results) -> dict:
+    counter = Counter(r["verdict"] for r in results)
+    return {verdict: counter.get(verdict, 0) for verdict in VERDICTS}
 
-    def stream_summaries():
-        print(f"Summarizing all resources")
+def final_verdict_data(results, text: str, from_memory: bool = False,
+                       sources_found: int = None, stopped_early: bool = False) -> dict:
+    return {
+        "verdict": weighted_verdict(results),
+        "counts": verdict_counts(results),
+        "scores": {verdict: round(score, 2) for verdict, score in verdict_scores(results).items()},
+        "total": len(results),
+        "evaluated": len(results),
+        "sources_found": sources_found,
+        "stopped_early": stopped_early,
+        "text": text,
+        "from_memory": from_memory,
+    }
 
-        for i, src in enumerate(sources):
-            summ , short_summary = summarize_url(src['url'])
-            summary.append(summ)
-            output_queue.put(f"🔍 Summary of {src['url']}:\n{short_summary}\n")
+def judgment_data(index: int, url: str, result: dict) -> dict:
+    return {
+        "source_id": index + 1,
+        "url": url,
+        "verdict": result["verdict"],
+        "confidence": result["confidence"],
+        "reason": result["reason"],
+    }
 
-    def stream_judgments():
 
-        judgments = []
-        print(f"Judging claim against {len(sources)} summaries")
-        if len(summary)==len(sources):
-            output_queue.put(f"⚖️ Judging claim against {len(sources)} sources\n")
+class TextRenderer:
+    """
+    Renders pipeline events as the plain-text transcript /fact-check has always streamed.
+    Token events of concurrently processed sources go through a StreamFloor, so the
+    text of one source is never interleaved with another's.
+    """
 
-        while len(summary) < len(sources):
-            pass  # Wait for summaries
+    def __init__(self, emit):
+        self.floor = StreamFloor(emit)
+        self.total = 0
+        self.last_text = {}   # streamed message key -> last text written under it
 
-        for i, src in enumerate(sources):
-            result = judge_claim_against_summary(claim, summary[i])
-            print(result["raw"])
+    def label(self, data) -> str:
+        return f"[{data['source_id']}/{self.total}] {data['url']}"
+
+    def _end_stream(self, key) -> bool:
+        """
+        Finish a streamed message; returns False if nothing was streamed under `key`.
+        """
+        if key not in self.last_text:
+            return False
+        if not self.last_text.pop(key).endswith("\n"):
+            self.floor.write(key, "\n")
+        self.floor.close(key)
+        return True
+
+    def _end_all_streams(self):
+        """
+        Finish messages cut off by cancelled work, so they don't hold the floor.
+        """
+        for key in list(self.last_text):
+            self._end_stream(key)
+
+    def __call__(self, event_type: str, data: dict):
+        floor = self.floor
+        if event_type == "search_started":
+            floor.message(f"🌐 Searching web for: {data['claim']}\n")
+        elif event_type == "search_done":
+            self.total = data["count"]
+            floor.message(f"\n\n🧠 Summarizing and judging {self.total} sources as they arrive : \n")
+        elif event_type == "source_ok":
+            floor.message(f"✔️ Found source: {data['url']}\n")
+        elif event_type == "source_skipped":
+            floor.message(f"Skipping source (unreachable or empty): {data['url']}\n")
+        elif event_type in ("summary_started", "judgment_started"):
+            key = (data["source_id"], event_type.split("_")[0])
+            header = "🔍 Summary of" if key[1] == "summary" else "💡 Judgment for"
+            self.last_text[key] = f"{header} {self.label(data)}:\n"
+            floor.write(key, self.last_text[key])
+        elif event_type in ("summary_token", "judgment_token"):
+            key = (data["source_id"], event_type.split("_")[0])
+            self.last_text[key] = data["text"]
+            floor.write(key, data["text"])
+        elif event_type == "summary":
+            if not self._end_stream((data["source_id"], "summary")):
+                floor.message(f"🔍 Summary of {self.label(data)}:\n{data['short_summary']}\n")
+        elif event_type == "judgment":
+            if not self._end_stream((data["source_id"], "judgment")):
+                floor.message(f"💡 Judgment for {self.label(data)}:\n" + \
+                    f"Verdict: {data['verdict']}\n" + \
+                    # f"Confidence: {data['confidence']}%\n" + \
+                    f"Reason: {data['reason']}\n")
+        elif event_type == "source_failed":
+            for kind in ("summary", "judgment"):
+                self._end_stream((data["source_id"], kind))
+            floor.message(f"⚠️ Could not evaluate {self.label(data)}: {data['error']}\n")
+        elif event_type == "early_stop":
+            self._end_all_streams()
+            floor.message(f"⏩ Verdict settled ({data['verdict']}) after {data['evaluated']} sources; " + \
+                f"skipping the rest (up to {data['remaining']} sources)\n")
+        elif event_type == "judging_batch":
+            floor.message(f"⚖️ Judging claim against {data['count']} sources\n")
+        elif event_type == "memory_hit":
+            floor.message(f"🗂️ Found {data['count']} stored judgments for this claim, answering from memory\n")
+            for m in data["matches"]:
+                checked = time.strftime("%Y-%m-%d", time.localtime(m["checked_at"]))
+                floor.message(f"💾 Stored judgment for {m.get('url') or 'unknown source'} " + \
+                    f"(from memory, similarity {m['similarity']:.2f}, checked {checked}):\n" + \
+                    f"Past claim: {m['claim']}\n" + \
+                    f"Verdict: {m['verdict']}\n" + \
+                    (f"Reason: {m['reason']}\n" if m.get("reason") else ""))
+        elif event_type == "final_verdict":
+            self._end_all_streams()
+            title = "📊 Final Verdict (from memory):" if data["from_memory"] else "📊 Final Verdict:"
+            floor.message(f"{title}\n{data['text']}\n")
+        elif event_type == "error":
+            self._end_all_streams()
+            floor.message(f"❌ Fact-check failed: {data['message']}\n")
+        elif event_type == "cancelled":
+            self._end_all_streams()
+            floor.message(f"⛔ Fact-check cancelled ({data['reason']})\n")
+        # heartbeat and unknown events have no text form
+
+
+def check_claim(claim: str, on_event, shared: SharedWork = None, trace: Trace = None,
+                cancel: CancelToken = None) -> dict:
+    """
+    Run the fact-check for one claim, reporting progress as `on_event(event_type, data)`.
+
+    Sources are fetched concurrently; as soon as a page arrives it is summarized and
+    judged on the worker pool, so each source flows fetch -> summarize -> judge on its own
+    and events arrive in completion order. With BATCH_JUDGE the judge step instead runs
+    once over all summaries. When `shared` is given, downloads and summaries are shared
+    with the other claims using it. Stage timings are recorded on `trace` when given.
+    Once `cancel` fires, pending downloads and LLM calls are dropped and Cancelled is raised.
+
+    With EARLY_STOP (and per-source judging) the remaining sources are dropped as soon as
+    their judgments could no longer change the confidence-weighted verdict.
+    Returns {"judgments": [...in source order], "sources_found": n, "stopped_early": bool}.
+    """
+    print(f"Searching web for: {claim}")
+    on_event("search_started", {"claim": claim})
+    with span("search", trace):
+        sources = run_research_agent(claim)
+    if cancel is not None:
+        cancel.check()
+    on_event("search_done", {
+        "count": len(sources),
+        "sources": [{"source_id": i + 1, "url": src["url"], "title": src["title"]}
+                    for i, src in enumerate(sources)],
+    })
+
+    # Work on the sources runs under `work`, which early stopping may cancel on its own
+    early_stop = EARLY_STOP and not BATCH_JUDGE
+    if early_stop:
+        work = cancel.child() if cancel is not None else CancelToken()
+        work.report = False
+    else:
+        work = cancel
+    progress = {"judged": [], "finished": 0, "stopped_early": False}
+    progress_lock = threading.Lock()
+
+    def source_finished(record=None):
+        """
+        Count a source as done; stops the remaining work once the verdict is settled.
+        """
+        if not early_stop:
+            return
+        with progress_lock:
+            progress["finished"] += 1
+            if record is not None:
+                progress["judged"].append(record)
+            remaining = len(sources) - progress["finished"]
+            if progress["stopped_early"] or not remaining or not verdict_settled(progress["judged"], remaining):
+                return
+            progress["stopped_early"] = True
+            verdict = weighted_verdict(progress["judged"])
+            evaluated = len(progress["judged"])
+        print(f"Verdict settled after {evaluated} sources, skipping the rest (up to {remaining})")
+        work.cancel("early_stop")
+        on_event("early_stop", {"evaluated": evaluated, "remaining": remaining, "verdict": verdict})
 
-            judgments.append({
+    def streamed(kind, index, src, produce):
+        """
+        Run `produce(on_token)`, forwarding its tokens as `<kind>_token` events.
+        """
+        source_id = index + 1
+        on_event(f"{kind}_started", {"source_id": source_id, "url": src["url"]})
+        return produce(lambda text: on_event(f"{kind}_token", {"source_id": source_id, "text": text}))
+
+    def process_source(index, src, content):
+        if work is not None and work.cancelled:
+            return None
+        if SELECT_PASSAGES:
+            with span("select_passages", trace, src['url']):
+                content = select_passages(content, claim)
+        try:
+            with span("summarize", trace, src['url']):
+                if shared is not None:
+                    content_key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                    summ, short_summary = shared.once(
+                        ("summary", content_key), lambda: summarize_url(src['url'], content=content)
+                    )
+                elif STREAM_TOKENS:
+                    summ, short_summary = streamed(
+                        "summary", index, src,
+                        lambda on_token: summarize_url(src['url'], content=content,
+                                                       on_short_token=on_token, cancel=work)
+                    )
+                else:
+                    summ, short_summary = summarize_url(src['url'], content=content, cancel=work)
+            on_event("summary", {"source_id": index + 1, "url": src["url"], "short_summary": short_summary})
+
+            record = {
+                "index": index,
                 "title": src["title"],
                 "url": src["url"],
-                "summary": summary[i],
-                "verdict": result["verdict"],
-                "confidence": result["confidence"],
-                "reason": result["reason"]
-            })
-
-            output_queue.put(f"💡 Judgment for {src['url']}:\n" + \
-                f"Verdict: {result['verdict']}\n" + \
-                # f"Confidence: {result['confidence']}%\n" + \
-                f"Reason: {result['reason']}\n")
-
-        print(f"Storing results in vector DB")
-        for r in judgments:
-            if r["verdict"] in {"Supports", "Refutes"}:
-                store_fact_check(
-                    claim=claim,
-                    verdict=r["verdict"],
-                    summary=r["summary"],
-                    metadata={"url": r["url"], "title": r["title"]}
-                )
-
-        summary_stats = aggregate_final_verdict(judgments)
-        output_queue.put(f"📊 Final Verdict:\n{summary_stats}\n")
-        output_queue.put(None)  # signal end
-
-
-    # def combine_streams():
-    #     # Yield resources, summaries, and judgments in sequence
-    #     yield from stream_resources()
-    #     yield from stream_summaries()
-    #     yield from stream_judgments()
-    threading.Thread(target=stream_summaries, daemon=True).start()
-    threading.Thread(target=stream_judgments, daemon=True).start()
-
-    def stream_output():
+                "summary": summ,
+            }
+            if BATCH_JUDGE:
+                return record
+
+            with span("judge", trace, src['url']):
+                if STREAM_TOKENS:
+                    result = streamed(
+                        "judgment", index, src,
+                        lambda on_token: judge_claim_against_summary(claim, summ, on_token=on_token,
+                                                                     cancel=work)
+                    )
+                else:
+                    result = judge_claim_against_summary(claim, summ, cancel=work)
+            print(result["raw"])
+            on_event("judgment", judgment_data(index, src["url"], result))
+        except Cancelled:
+            return None
+        except Exception as e:
+            print(f"Failed to process {src['url']}: {e}")
+            on_event("source_failed", {"source_id": index + 1, "url": src["url"], "error": str(e)})
+            source_finished()
+            return None
+
+        record.update(verdict=result["verdict"], confidence=result["confidence"], reason=result["reason"])
+        source_finished(record)
+        return record
+
+    positions = {}
+    for i, src in enumerate(sources):
+        positions.setdefault(src['url'], []).append(i)
+
+    def fetch(url, **kwargs):
+        with span("fetch", trace, url):
+            if shared is not None:
+                return shared.once(("fetch", url), lambda: scrape_url(url, **kwargs))
+            return scrape_url(url, cancel=work, **kwargs)
+
+    judgments = []
+    with ThreadPoolExecutor(max_workers=SOURCE_WORKERS) as pool:
+        futures = []
+        # Each source is downloaded once; its text goes straight to the reader agent
+        max_length = EXTRACT_MAX_CHARS if SELECT_PASSAGES else 4000
+        for url, raw_text in iter_fetch(list(positions), max_length=max_length, fetch=fetch, cancel=work):
+            if work is not None and work.cancelled:
+                break
+            for i in positions[url]:
+                if raw_text.strip():
+                    on_event("source_ok", {"source_id": i + 1, "url": url})
+                    futures.append(pool.submit(process_source, i, sources[i], raw_text))
+                else:
+                    on_event("source_skipped", {"source_id": i + 1, "url": url, "reason": "unreachable or empty"})
+                    source_finished()
+
+        for future in as_completed(futures):
+            result = future.result()
+            if result is not None:
+                judgments.append(result)
+
+    if early_stop:
+        work.close()
+        if progress["stopped_early"]:
+            # Sources already past the cancel checks still finish; count only the dropped ones
+            skipped = len(sources) - progress["finished"]
+            sources_skipped.inc(skipped)
+            print(f"Early stop skipped {skipped} of {len(sources)} sources")
+    if cancel is not None:
+        cancel.check()
+    judgments.sort(key=lambda r: r["index"])
+    if BATCH_JUDGE and judgments:
+        on_event("judging_batch", {"count": len(judgments)})
+        with span("judge_batch", trace):
+            results = judge_claim_against_summaries(claim, [r["summary"] for r in judgments], cancel=cancel)
+        for record, result in zip(judgments, results):
+            print(result["raw"])
+            on_event("judgment", judgment_data(record["index"], record["url"], result))
+            record.update(verdict=result["verdict"], confidence=result["confidence"], reason=result["reason"])
+    return {"judgments": judgments, "sources_found": len(sources), "stopped_early": progress["stopped_early"]}
+
+def store_and_aggregate(claim: str, outcome: dict, trace: Trace = None) -> str:
+    """
+    Persist the decisive judgments of a check_claim outcome to the vector store and
+    return the final verdict text.
+    """
+    judgments = outcome["judgments"]
+    print(f"Storing results in vector DB")
+    with span("store", trace):
+        store_fact_checks(claim, [
+            {
+                "summary": r["summary"],
+                "verdict": r["verdict"],
+                "metadata": {"url": r["url"], "title": r["title"],
+                             "confidence": r["confidence"], "reason": r["reason"]}
+            }
+            for r in judgments if r["verdict"] in {"Supports", "Refutes"}
+        ])
+
+    return aggregate_final_verdict(judgments, outcome["sources_found"], outcome["stopped_early"])
+
+def answer_from_memory(claim: str, on_event, trace: Trace = None) -> bool:
+    """
+    Report stored verdicts for a near-duplicate claim, if memory holds enough recent evidence.
+    Returns False (reporting nothing) when the full pipeline has to run.
+    """
+    with span("memory_lookup", trace):
+        matches = find_stored_verdicts(claim, MEMORY_SIMILARITY_THRESHOLD, MEMORY_MAX_AGE)
+    if len(matches) < MEMORY_MIN_SOURCES:
+        return False
+
+    print(f"Answering from memory with {len(matches)} stored judgments")
+    on_event("memory_hit", {
+        "count": len(matches),
+        "matches": [
+            {key: m.get(key) for key in ("url", "claim", "verdict", "reason", "similarity", "checked_at")}
+            for m in matches
+        ],
+    })
+    on_event("final_verdict", final_verdict_data(matches, aggregate_final_verdict(matches), from_memory=True))
+    return True
+
+def run_fact_check_events(claim: str, force_refresh: bool = False, cancel: CancelToken = None):
+    """
+    Fact-check `claim` on a background thread, yielding its progress as event dicts
+    {"event": type, "request_id": ..., "data": {...}}. A heartbeat event is yielded
+    whenever the pipeline has been quiet for HEARTBEAT_INTERVAL seconds.
+
+    The work stops with a "cancelled" event when `cancel` fires (by default a token
+    with REQUEST_DEADLINE) or when the consumer stops iterating early.
+    """
+    output_queue = queue.Queue()
+    trace = Trace("fact_check")
+    if cancel is None:
+        cancel = CancelToken(REQUEST_DEADLINE)
+
+    def on_event(event_type, data):
+        output_queue.put({"event": event_type, "request_id": trace.request_id, "data": data})
+
+    def run():
+        outcome = "ok"
+        try:
+            if MEMORY_FAST_PATH and not force_refresh and answer_from_memory(claim, on_event, trace):
+                outcome = "memory"
+                return
+            checked = check_claim(claim, on_event, trace=trace, cancel=cancel)
+            summary_stats = store_and_aggregate(claim, checked, trace)
+            on_event("final_verdict", final_verdict_data(checked["judgments"], summary_stats,
+                                                         sources_found=checked["sources_found"],
+                                                         stopped_early=checked["stopped_early"]))
+        except Cancelled:
+            outcome = "cancelled"
+            print(f"Fact-check cancelled for {claim}: {cancel.reason}")
+            on_event("cancelled", {"reason": cancel.reason})
+        except Exception as e:
+            outcome = "error"
+            print(f"Fact-check failed for {claim}: {e}")
+            on_event("error", {"message": str(e)})
+        finally:
+            cancel.close()
+            trace.finish(outcome)
+            output_queue.put(None)  # signal end
+
+    threading.Thread(target=run, daemon=True).start()
+
+    try:
         while True:
-            msg = output_queue.get()
-            if msg is None:
+            try:
+                event = output_queue.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield {"event": "heartbeat", "request_id": trace.request_id, "data": {"time": time.time()}}
+                continue
+            if event is None:
                 break
-            yield msg
+            yield event
+    finally:
+        cancel.cancel("abandoned")  # no-op unless the consumer stopped before the end
 
-    return stream_output()
+def run_fact_check_stream(claim: str, session_id: str, force_refresh: bool = False,
+                          cancel: CancelToken = None):
+    """
+    Plain-text form of run_fact_check_events, as streamed by /fact-check.
+    """
+    chunks = []
+    render = TextRenderer(chunks.append)
+    for event in run_fact_check_events(claim, force_refresh=force_refresh, cancel=cancel):
+        render(event["event"], event["data"])
+        yield from chunks
+        chunks.clear()
 
-def answer_followup(session, question: str, claim: str):
+def run_fact_check_batch(claims: list):
+    """
+    Fact-check several claims, BATCH_CLAIM_WORKERS at a time, yielding one result dict
+    per claim as it completes. URLs shared by several claims are fetched once, and summarized
+    once per distinct set of selected passages.
+    """
+    shared = SharedWork()
 
-    session_history = session.get("history", [])
-    original_claim = session_history[0]["content"] if session_history else "unknown claim"
+    def run(index, claim):
+        transcript = []
+        result = {"index": index, "claim": claim}
+        trace = Trace("batch_claim")
+        try:
+            checked = check_claim(claim, TextRenderer(transcript.append), shared=shared, trace=trace)
+            judgments = checked["judgments"]
+            result["final_verdict"] = store_and_aggregate(claim, checked, trace)
+            result["verdict"] = weighted_verdict(judgments)
+            result["sources_evaluated"] = len(judgments)
+            result["sources_found"] = checked["sources_found"]
+            result["judgments"] = [
+                {key: r[key] for key in ("title", "url", "verdict", "confidence", "reason")}
+                for r in judgments
+            ]
+        except Exception as e:
+            print(f"Fact-check failed for {claim}: {e}")
+            result["error"] = str(e)
+        trace.finish("error" if "error" in result else "ok")
+        result["transcript"] = "".join(transcript)
+        return result
 
+    with ThreadPoolExecutor(max_workers=BATCH_CLAIM_WORKERS) as pool:
+        futures = [pool.submit(run, i, claim) for i, claim in enumerate(claims)]
+        for future in as_completed(futures):
+            yield future.result()
+
+def stream_followup(session, question: str, claim: str, cancel: CancelToken = None):
+    """
+    Answer a follow-up question, yielding the answer as the LLM generates it.
+    The exchange is added to the session history once the answer is complete;
+    a cancelled answer just ends the stream and leaves the history untouched.
+    """
+    session_history = session.setdefault("history", [])
+    if not claim:
+        claim = session_history[0]["content"] if session_history else "unknown claim"
+
+    trace = Trace("followup")
     # Retrieve and format past relevant fact-checks
-    past_evidence = search_similar_claims(claim)
+    with span("memory_search", trace):
+        past_evidence = search_similar_claims(claim)
     if past_evidence and past_evidence.get("documents") and past_evidence["documents"][0]:
         past_context = format_results(
             past_evidence["documents"][0],
@@ -124,17 +635,27 @@ def answer_followup(session, question: str, claim: str):
         past_context = "No relevant past fact-checks found."
 
     print(f"Past facts found : {past_context}")
-    context = f"Claim: {original_claim}\n\n"
-    context += f"Relevant past facts:\n{past_context}\n\n"
-    context += "Conversation history:\n"
-    for h in session_history:
-        context += f"{h['role'].capitalize()}: {h['content']}\n"
-    context += f"\nUser: {question}\nAssistant:"
+    with span("followup_context", trace):
+        context = build_followup_prompt(session, question, claim, past_context)
 
-    answer = local_llm_chain_ask(prompt_text="", template=context)
+    chunks = []
+    try:
+        with span("answer", trace):
+            for chunk in local_llm_stream(prompt_text="", template=context, priority=PRIORITY_INTERACTIVE,
+                                          cancel=cancel):
+                chunks.append(chunk)
+                yield chunk
+    except Cancelled:
+        trace.finish("cancelled")
+        return
+    except Exception:
+        trace.finish("error")
+        raise
+    answer = "".join(chunks)
+    trace.finish()
 
     session["history"].append({"role": "user", "content": question})
     session["history"].append({"role": "assistant", "content": answer})
 
-    return answer
-
+def answer_followup(session, question: str, claim: str):
+    return "".join(stream_followup(session, question, claim))
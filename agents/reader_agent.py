@@ -1,8 +1,12 @@
 # agents/reader_agent.py
+import re
 
 from tools.scrape_url import scrape_url
 from tools.local_llm import local_llm_chain_ask
 
+# One generation returns both summaries; set to False for the two-call path
+SINGLE_PASS_SUMMARY = True
+
 SUMMARY_PROMPT_TEMPLATE = """
 You are a helpful assistant. Summarize the following article content clearly and concisely.
 
@@ -17,18 +21,156 @@ Article:
 {article}
 """
 
-def summarize_url(url: str) -> str:
-    content = scrape_url(url)
+COMBINED_SUMMARY_PROMPT_TEMPLATE = """
+You are a helpful assistant. Read the following article and write two summaries of it.
+
+Respond **exactly** in this format:
+SHORT SUMMARY:
+[2-3 sentences, only the key facts]
+DETAILED SUMMARY:
+[clear and concise summary of the whole article]
+
+Article:
+{article}
+"""
+
+_SHORT_HEADER = re.compile(r"^[\s*#>_-]*short\s+summary[\s*_]*:[\s*_]*", re.IGNORECASE | re.MULTILINE)
+_DETAILED_HEADER = re.compile(r"^[\s*#>_-]*(?:detailed|long|full)?\s*summary[\s*_]*:[\s*_]*", re.IGNORECASE | re.MULTILINE)
+
+
+def _first_sentences(text: str, count: int = 3) -> str:
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    return " ".join(sentences[:count])
+
+
+def parse_combined_summary(raw_output: str) -> tuple:
+    """
+    Split a COMBINED_SUMMARY_PROMPT_TEMPLATE answer into (summary, short_summary).
+    Falls back to the whole answer and its first sentences when the headers are missing.
+    """
+    text = raw_output.strip()
+    short_match = _SHORT_HEADER.search(text)
+    detailed_match = None
+    for match in _DETAILED_HEADER.finditer(text):
+        if short_match is None or match.start() != short_match.start():
+            detailed_match = match
+            break
+
+    if short_match and detailed_match:
+        if short_match.start() < detailed_match.start():
+            short_summary = text[short_match.end():detailed_match.start()]
+            summary = text[detailed_match.end():]
+        else:
+            summary = text[detailed_match.end():short_match.start()]
+            short_summary = text[short_match.end():]
+    elif detailed_match:
+        summary = text[detailed_match.end():]
+        short_summary = _first_sentences(summary)
+    elif short_match:
+        short_summary = text[short_match.end():]
+        summary = short_summary
+    else:
+        summary = text
+        short_summary = _first_sentences(text)
+
+    summary, short_summary = summary.strip(), short_summary.strip()
+    if not summary:
+        summary = short_summary or text
+    if not short_summary:
+        short_summary = _first_sentences(summary)
+    return summary, short_summary
+
+
+class ShortSummaryStream:
+    """
+    Forwards only the SHORT SUMMARY section of a streamed combined answer to `on_token`.
+    A few trailing characters are held back so a header split across chunks is never forwarded.
+    """
+    HOLD_BACK = 32
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self.buffer = ""
+        self.start = None     # offset where the short summary begins
+        self.sent = 0         # offset forwarded so far
+        self.done = False
+        self.forwarded = False
+
+    def _forward(self, end, final=False):
+        text = self.buffer[self.sent:end]
+        if self.sent == self.start:
+            text = text.lstrip()
+        if final:
+            text = text.rstrip()
+        if text:
+            self.on_token(text)
+            self.forwarded = True
+        self.sent = max(self.sent, end)
+
+    def feed(self, chunk: str):
+        if self.done:
+            return
+        self.buffer += chunk
+        if self.start is None:
+            match = _SHORT_HEADER.search(self.buffer)
+            # Wait for a character past the header so its trailing markup is fully consumed
+            if match is None or match.end() == len(self.buffer):
+                return
+            self.start = self.sent = match.end()
+
+        for match in _DETAILED_HEADER.finditer(self.buffer, self.start):
+            self._forward(match.start(), final=True)
+            self.done = True
+            return
+        self._forward(max(self.sent, len(self.buffer) - self.HOLD_BACK))
+
+    def close(self):
+        if self.start is None:
+            match = _SHORT_HEADER.search(self.buffer)
+            if match is not None:
+                self.start = self.sent = match.end()
+        if self.start is not None and not self.done:
+            self._forward(len(self.buffer), final=True)
+        self.done = True
+
+
+def summarize_url(url: str, content: str = None, on_short_token=None, cancel=None) -> tuple:
+    """
+    Summarize a source. Pass `content` when the page was already fetched
+    so it isn't downloaded a second time. When `on_short_token` is given, the short
+    summary is streamed to it while it is generated. `cancel` aborts the LLM calls.
+    """
+    if content is None:
+        content = scrape_url(url)
     if not content:
-        return "Could not extract content."
+        return "Could not extract content.", "Could not extract content."
+
+    if SINGLE_PASS_SUMMARY:
+        short_stream = ShortSummaryStream(on_short_token) if on_short_token else None
+        raw_output = local_llm_chain_ask(
+            prompt_text="",  # entire prompt comes from the template
+            template=COMBINED_SUMMARY_PROMPT_TEMPLATE.format(article=content),
+            on_token=short_stream.feed if short_stream else None,
+            cancel=cancel
+        )
+        summary, short_summary = parse_combined_summary(raw_output)
+        if short_stream:
+            short_stream.close()
+            if not short_stream.forwarded:
+                # The answer had no recognisable header; send the parsed fallback instead
+                on_short_token(short_summary)
+        return summary, short_summary
 
     summary = local_llm_chain_ask(
         prompt_text="",  # entire prompt comes from the template
-        template=SUMMARY_PROMPT_TEMPLATE.format(article=content)
+        template=SUMMARY_PROMPT_TEMPLATE.format(article=content),
+        cancel=cancel
     )
     short_summary = local_llm_chain_ask(
         prompt_text="",  # entire prompt comes from the template
-        template=SHORT_SUMMARY_PROMPT_TEMPLATE.format(article=content)
+        template=SHORT_SUMMARY_PROMPT_TEMPLATE.format(article=content),
+        on_token=on_short_token,
+        cancel=cancel
     )
 
     return summary, short_summary
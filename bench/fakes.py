@@ -0,0 +1,180 @@
+# bench/fakes.py
+"""
+Local stand-ins for the services the pipeline talks to: an Ollama-compatible
+generate endpoint, a Serper-compatible search endpoint and a static HTML corpus.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERDICTS = ["Supports", "Refutes", "Neutral"]
+
+FILLER_LINES = [
+    "Home | News | World | Politics | Science | Sports | Weather",
+    "Subscribe to our newsletter for the latest updates.",
+    "Advertisement",
+    "We use cookies to improve your experience. Read our cookie policy.",
+    "Related stories: the week in pictures, markets roundup, celebrity news",
+    "Share this article on social media",
+]
+
+TOPICS = [
+    "the Earth is round", "coffee improves memory", "electric cars emit no carbon",
+    "the Great Wall is visible from space", "humans use ten percent of their brains",
+    "lightning never strikes the same place twice", "vaccines cause autism",
+    "goldfish have a three second memory", "bananas are radioactive", "the moon landing was staged",
+]
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _words(rng, count):
+    vocabulary = ("evidence study report experts data research according analysis researchers "
+                  "claim scientists published found results source official review").split()
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+
+def fake_completion(prompt: str) -> str:
+    """
+    A deterministic answer shaped like what the prompt asks for.
+    """
+    rng = random.Random(_seed(prompt))
+    if "Source: [number]" in prompt:
+        count = int(re.search(r"Summaries of (\d+) source", prompt).group(1))
+        return "\n".join(
+            f"---\nSource: {i}\nVerdict: {rng.choice(VERDICTS)}\n"
+            f"Confidence: {rng.randint(40, 95)}\nReason: {_words(rng, 14)}.\n---"
+            for i in range(1, count + 1)
+        )
+    if "Verdict: [Supports / Refutes / Neutral]" in prompt:
+        return (f"---\nVerdict: {rng.choice(VERDICTS)}\nConfidence: {rng.randint(40, 95)}\n"
+                f"Reason: {_words(rng, 18)}.\n---")
+    if "SHORT SUMMARY:" in prompt:
+        return f"SHORT SUMMARY:\n{_words(rng, 30)}.\nDETAILED SUMMARY:\n{_words(rng, 90)}."
+    return f"{_words(rng, 60)}."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status, body: bytes, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeOllamaHandler(_Handler):
+    token_latency = 0.01      # seconds per generated token
+    prompt_latency = 0.0005   # seconds per prompt token (prompt ingestion)
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send(404, b"{}", "application/json")
+            return
+        request = self._read_json()
+        prompt = request.get("prompt", "")
+        time.sleep(self.prompt_latency * len(prompt.split()))
+
+        tokens = re.findall(r"\S+\s*|\s+", fake_completion(prompt))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(self.token_latency)
+                self._chunk(json.dumps({"model": request.get("model"), "response": token, "done": False}))
+            self._chunk(json.dumps({"model": request.get("model"), "response": "", "done": True,
+                                    "prompt_eval_count": len(prompt.split()), "eval_count": len(tokens)}))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-generation
+
+    def _chunk(self, line):
+        data = (line + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeSearchHandler(_Handler):
+    corpus_url = "http://127.0.0.1:0"
+    corpus_size = 50
+    latency = 0.05
+
+    def do_POST(self):
+        query = self._read_json().get("q", "")
+        time.sleep(self.latency)
+        rng = random.Random(_seed(query.lower()))
+        # Pages cluster by topic so related claims share sources, like real news results
+        base = _seed(query.lower().split(" ")[0]) % self.corpus_size
+        pages = [(base + rng.randint(0, 9)) % self.corpus_size for _ in range(8)]
+        organic = [
+            {"title": f"Article {n}", "link": f"{self.corpus_url}/page/{n}", "snippet": f"Snippet for page {n}"}
+            for n in dict.fromkeys(pages)
+        ]
+        self._send(200, json.dumps({"organic": organic}).encode("utf-8"), "application/json")
+
+
+class CorpusHandler(_Handler):
+    latency = 0.02
+    pdf_every = 17   # every n-th page is served as a PDF to exercise content-type rejection
+
+    def do_GET(self):
+        match = re.fullmatch(r"/page/(\d+)", self.path)
+        if not match:
+            self._send(404, b"not found", "text/plain")
+            return
+        number = int(match.group(1))
+        time.sleep(self.latency)
+        etag = f'"page-{number}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.pdf_every and number % self.pdf_every == self.pdf_every - 1:
+            self._send(200, b"%PDF-1.4 " + b"\0" * 50000, "application/pdf")
+            return
+        self._send(200, build_page(number).encode("utf-8"), "text/html; charset=utf-8", {"ETag": etag})
+
+
+def build_page(number: int) -> str:
+    rng = random.Random(number)
+    topic = TOPICS[number % len(TOPICS)]
+    lines = []
+    for i in range(rng.randint(150, 400)):
+        if i % 25 == 12:
+            lines.append(f"<p>Researchers examined whether {topic}. {_words(rng, 40)}.</p>")
+        else:
+            lines.append(f"<div>{rng.choice(FILLER_LINES)}</div>")
+    script = "<script>" + "var tracking = 1;" * 200 + "</script>"
+    return f"<html><head><title>Article {number}</title>{script}</head><body>{''.join(lines)}</body></html>"
+
+
+def start_server(handler_class, **attributes):
+    """
+    Start `handler_class` on a free local port in a daemon thread; returns (server, base_url).
+    """
+    handler = type(handler_class.__name__, (handler_class,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,389 @@
+# bench/run_bench.py
+"""
+Offline end-to-end benchmark.
+
+Starts local stand-ins for Ollama, Serper and the web (see bench/fakes.py), points the
+app at them and drives the fact-check pipeline, follow-ups and the HTTP API at a fixed
+concurrency. Reports per-stage latency percentiles, claims/minute and peak memory, and
+writes everything to bench/results/<timestamp>.json so runs can be compared.
+
+    python -m bench.run_bench --claims 20 --concurrency 4 --token-latency 0.01
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import fakes
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+CLAIM_PREFIXES = ["", "It is true that ", "Some people say ", "Is it a fact that "]
+FOLLOWUP_QUESTIONS = [
+    "Which source was the most reliable?",
+    "Why do the sources disagree?",
+    "Summarize the evidence in one sentence.",
+]
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations per stage from every thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def report(self):
+        with self.lock:
+            return {stage: summarize(values) for stage, values in sorted(self.samples.items())}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+class HashingEmbedder:
+    """
+    Bag-of-words hashing embedder, used with --fake-embedder to keep sentence-transformers
+    (and its model download) out of the measurement.
+    """
+
+    dimensions = 256
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1.0
+            norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+            vectors.append([x / norm for x in vector])
+        return vectors
+
+
+def make_claims(count, repeat_ratio, seed=0):
+    """
+    `count` claims built from the fake corpus topics; about `repeat_ratio` of them repeat
+    an earlier claim (reworded), to exercise the caches and the memory fast path.
+    """
+    rng = random.Random(seed)
+    claims = []
+    for i in range(count):
+        if claims and rng.random() < repeat_ratio:
+            base = re.sub(r"^(%s)" % "|".join(p for p in CLAIM_PREFIXES if p), "", rng.choice(claims))
+            claims.append(rng.choice(CLAIM_PREFIXES) + base)
+        else:
+            topic = fakes.TOPICS[i % len(fakes.TOPICS)]
+            claims.append(f"{topic[0].upper()}{topic[1:]}" + (f" (case {i})" if i >= len(fakes.TOPICS) else ""))
+    return claims
+
+
+def configure_app(args, timer):
+    """
+    Point the app modules at the stand-in servers and wrap the stages we time.
+    """
+    servers = []
+    server, corpus_url = fakes.start_server(fakes.CorpusHandler, latency=args.page_latency)
+    servers.append(server)
+    server, search_url = fakes.start_server(fakes.FakeSearchHandler, corpus_url=corpus_url,
+                                            latency=args.search_latency)
+    servers.append(server)
+    server, ollama_url = fakes.start_server(fakes.FakeOllamaHandler, token_latency=args.token_latency)
+    servers.append(server)
+
+    from tools import web_search, local_llm
+    from retriever import vector_store
+    from agents import pipeline
+
+    web_search.SEARCH_URL = f"{search_url}/search"
+    web_search.SERPER_API_KEY = "bench"
+    local_llm.OLLAMA_BASE_URL = ollama_url
+    if args.fake_embedder:
+        vector_store._embedder = HashingEmbedder()
+
+    pipeline.MEMORY_FAST_PATH = not args.no_memory
+    pipeline.run_research_agent = timer.wrap("search", pipeline.run_research_agent)
+    pipeline.summarize_url = timer.wrap("summarize", pipeline.summarize_url)
+    pipeline.judge_claim_against_summary = timer.wrap("judge", pipeline.judge_claim_against_summary)
+    pipeline.judge_claim_against_summaries = timer.wrap("judge_batch", pipeline.judge_claim_against_summaries)
+    pipeline.store_fact_checks = timer.wrap("store", pipeline.store_fact_checks)
+    pipeline.find_stored_verdicts = timer.wrap("memory_lookup", pipeline.find_stored_verdicts)
+    pipeline.search_similar_claims = timer.wrap("memory_search", pipeline.search_similar_claims)
+    # check_claim hands iter_fetch its own fetch function, which calls pipeline.scrape_url
+    pipeline.scrape_url = timer.wrap("fetch", pipeline.scrape_url)
+    return servers
+
+
+def timed_stream(chunks, started):
+    """
+    Drain a chunk iterator; returns (time to first chunk, total time, text).
+    """
+    first = None
+    parts = []
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+        parts.append(chunk)
+    return first, time.perf_counter() - started, "".join(parts)
+
+
+def run_concurrently(jobs, concurrency):
+    """
+    Run the zero-argument callables in `jobs`, `concurrency` at a time.
+    Returns (results, wall time); a job that raises is recorded as its exception text.
+    """
+    def guarded(job):
+        try:
+            return job()
+        except Exception as e:
+            print(f"Benchmark job failed: {e}")
+            return {"error": str(e)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(guarded, jobs))
+    return results, time.perf_counter() - started
+
+
+def mode_report(results, wall_time, claims_done):
+    ok = [r for r in results if "error" not in r]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "wall_time": wall_time,
+        "claims_per_minute": claims_done / wall_time * 60 if wall_time else None,
+        "time_to_first_chunk": summarize([r["first_chunk"] for r in ok if r.get("first_chunk") is not None]),
+        "end_to_end": summarize([r["total"] for r in ok]),
+        "from_memory": sum(1 for r in ok if r.get("from_memory")),
+    }
+
+
+def bench_pipeline(claims, concurrency):
+    from agents.pipeline import run_fact_check_stream
+
+    def job(claim):
+        started = time.perf_counter()
+        first, total, text = timed_stream(run_fact_check_stream(claim, session_id=None), started)
+        return {"first_chunk": first, "total": total, "from_memory": "(from memory)" in text,
+                "failed": "❌ Fact-check failed" in text}
+
+    results, wall_time = run_concurrently([lambda c=c: job(c) for c in claims], concurrency)
+    report = mode_report(results, wall_time, len(claims))
+    report["failed_checks"] = sum(1 for r in results if r.get("failed"))
+    return report
+
+
+def bench_followup(claims, concurrency):
+    from agents.pipeline import answer_followup, stream_followup
+
+    def job(index, claim):
+        session = {"history": [{"role": "user", "content": claim}], "claim": claim}
+        started = time.perf_counter()
+        # The first question streams so time to first token is visible; the rest use answer_followup
+        first, total, _ = timed_stream(stream_followup(session, FOLLOWUP_QUESTIONS[0], claim), started)
+        for question in FOLLOWUP_QUESTIONS[1:]:
+            answer_followup(session, question, claim)
+        return {"first_chunk": first, "total": time.perf_counter() - started}
+
+    results, wall_time = run_concurrently([lambda i=i, c=c: job(i, c) for i, c in enumerate(claims)],
+                                          concurrency)
+    report = mode_report(results, wall_time, len(claims))
+    report["questions_per_session"] = len(FOLLOWUP_QUESTIONS)
+    return report
+
+
+def start_api_server():
+    import uvicorn
+    import main
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+
+def bench_api(claims, concurrency):
+    import requests
+
+    server, base_url = start_api_server()
+
+    def job(claim):
+        with requests.Session() as http:
+            session_id = http.post(f"{base_url}/new-session").json()["session_id"]
+            started = time.perf_counter()
+            with http.post(f"{base_url}/fact-check", json={"claim": claim, "session_id": session_id},
+                           stream=True) as response:
+                response.raise_for_status()
+                first, total, text = timed_stream(
+                    response.iter_content(chunk_size=None, decode_unicode=True), started)
+            followup_started = time.perf_counter()
+            with http.post(f"{base_url}/followup-stream",
+                           json={"session_id": session_id, "question": FOLLOWUP_QUESTIONS[0]},
+                           stream=True) as response:
+                followup_first, followup_total, _ = timed_stream(
+                    response.iter_content(chunk_size=None, decode_unicode=True), followup_started)
+        return {"first_chunk": first, "total": total, "from_memory": "(from memory)" in text,
+                "followup_first_chunk": followup_first, "followup_total": followup_total}
+
+    try:
+        results, wall_time = run_concurrently([lambda c=c: job(c) for c in claims], concurrency)
+        with requests.get(f"{base_url}/ready") as response:
+            ready = response.json()
+    finally:
+        server.should_exit = True
+
+    report = mode_report(results, wall_time, len(claims))
+    ok = [r for r in results if "error" not in r]
+    report["followup_first_chunk"] = summarize([r["followup_first_chunk"] for r in ok
+                                                if r["followup_first_chunk"] is not None])
+    report["followup_total"] = summarize([r["followup_total"] for r in ok])
+    report["startup"] = ready
+    return report
+
+
+def cache_stats():
+    from tools.scrape_url import scrape_cache
+    from tools.web_search import search_cache
+    from tools.local_llm import llm_cache, llm_scheduler
+    stats = {cache.name: dict(cache.stats) for cache in (scrape_cache, search_cache, llm_cache)}
+    stats["llm_scheduler"] = llm_scheduler.stats()
+    return stats
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+MODES = {"pipeline": bench_pipeline, "followup": bench_followup, "api": bench_api}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--claims", type=int, default=20, help="claims checked per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="claims in flight at once")
+    parser.add_argument("--modes", default="pipeline,followup",
+                        help=f"comma-separated subset of {','.join(MODES)}")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3,
+                        help="share of claims that reword an earlier one")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake Ollama seconds per token")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="fake Serper seconds per query")
+    parser.add_argument("--page-latency", type=float, default=0.02, help="corpus seconds per page")
+    parser.add_argument("--no-memory", action="store_true", help="disable the stored-verdict fast path")
+    parser.add_argument("--fake-embedder", action="store_true",
+                        help="use a hashing embedder instead of sentence-transformers")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also trace Python heap allocations (slower, more precise peak)")
+    parser.add_argument("--label", default="", help="free-form note stored with the results")
+    parser.add_argument("--output", help="results file (default: bench/results/<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        raise SystemExit(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    output = os.path.abspath(args.output or os.path.join(
+        RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json"))
+    claims = make_claims(args.claims, args.repeat_ratio)
+
+    # Caches and the vector store live under ./memory; start every run from an empty one
+    workdir = tempfile.mkdtemp(prefix="factcheck-bench-")
+    os.chdir(workdir)
+    print(f"Benchmark working directory: {workdir}")
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    timer = StageTimer()
+    configure_app(args, timer)
+
+    results = {
+        "label": args.label,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "modes": {},
+    }
+    for mode in modes:
+        print(f"Running {mode} benchmark: {len(claims)} claims, concurrency {args.concurrency}")
+        results["modes"][mode] = MODES[mode](claims, args.concurrency)
+
+    results["stages"] = timer.report()
+    results["caches"] = cache_stats()
+    results["memory"] = {"peak_rss_mb": peak_rss_mb()}
+    if args.tracemalloc:
+        results["memory"]["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print_summary(results)
+    print(f"Results written to {output}")
+    return results
+
+
+def print_summary(results):
+    for mode, report in results["modes"].items():
+        e2e = report["end_to_end"]
+        first = report["time_to_first_chunk"]
+        print(f"{mode}: {report['claims_per_minute']:.1f} claims/min, errors {report['errors']}, "
+              f"e2e p50 {e2e.get('p50', 0):.2f}s p99 {e2e.get('p99', 0):.2f}s, "
+              f"first chunk p50 {first.get('p50', 0):.2f}s")
+    for stage, stats in results["stages"].items():
+        print(f"  {stage:<14} n={stats['count']:<5} p50 {stats['p50']:.3f}s "
+              f"p90 {stats['p90']:.3f}s p99 {stats['p99']:.3f}s")
+    print(f"Peak RSS: {results['memory']['peak_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
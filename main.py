@@ -1,13 +1,47 @@
-from fastapi import FastAPI, Request
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from agents.pipeline import answer_followup, run_fact_check_stream
-from server.session import SessionManager
-from fastapi.responses import StreamingResponse
+from agents.pipeline import (
+    stream_followup, run_fact_check_events, run_fact_check_stream, run_fact_check_batch, REQUEST_DEADLINE
+)
+from server import startup
+from server.jobs import FINISHED_STATES, JOB_DB, JOB_POLL_INTERVAL, JobQueue, start_workers, stop_workers
+from server.session import SessionManager, SQLiteSessionBackend
+from tools.cancel import CancelToken
+from tools.telemetry import registry, render_metrics
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sse_starlette.sse import EventSourceResponse
+
+startup.record_timing("imports", time.perf_counter() - _import_start)
+
+# Set FACTCHECK_WARMUP=1 to preload the LLM client and embedder when a worker starts
+WARM_UP_ON_STARTUP = os.getenv("FACTCHECK_WARMUP", "0") == "1"
+# Set FACTCHECK_SESSION_DB to a SQLite file path to share sessions between workers
+SESSION_DB = os.getenv("FACTCHECK_SESSION_DB")
+# Job queue shared by the API and the job workers (see server/jobs.py)
+JOBS_DB = os.getenv("FACTCHECK_JOB_DB", JOB_DB)
+# Set FACTCHECK_JOB_WORKERS=N to run N job worker processes alongside this server
+JOB_WORKERS = int(os.getenv("FACTCHECK_JOB_WORKERS", "0"))
+
+DISCONNECT_POLL_INTERVAL = 1.0  # seconds between client disconnect checks while streaming
 
 app = FastAPI()
-session_manager = SessionManager()
+session_manager = SessionManager(backend=SQLiteSessionBackend(SESSION_DB) if SESSION_DB else None)
+job_queue = JobQueue(JOBS_DB)
+job_workers = None   # (processes, stop event) when this server runs its own workers
+
+registry.gauge("factcheck_jobs_queued", "Fact-check jobs waiting for a worker", lambda: job_queue.count("queued"))
+registry.gauge("factcheck_jobs_running", "Fact-check jobs being run by a worker", lambda: job_queue.count("running"))
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,31 +50,168 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def warm_up_on_startup():
+    if WARM_UP_ON_STARTUP:
+        startup.start_warm_up()
+
+@app.on_event("startup")
+def start_job_workers():
+    global job_workers
+    if JOB_WORKERS > 0:
+        job_workers = start_workers(JOB_WORKERS, JOBS_DB)
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    if job_workers is not None:
+        stop_workers(*job_workers)
+
 class FactCheckRequest(BaseModel):
     claim: str
     session_id: str = None
+    force_refresh: bool = False  # skip stored verdicts and run a fresh check
+    stream: str = "text"  # "text" for the plain-text transcript, "events" for typed server-sent events
+    deadline: float = None  # seconds before the check is cancelled (REQUEST_DEADLINE by default)
+    job: bool = False  # enqueue a background job and return its id instead of streaming
+
+class BatchFactCheckRequest(BaseModel):
+    claims: List[str]
 
 class FollowUpRequest(BaseModel):
     session_id: str
     question: str
 
+async def stream_until_disconnect(chunks, http_request: Request, cancel: CancelToken):
+    """
+    Stream a blocking generator from the thread pool. When the client disconnects, or the
+    response stops early for any other reason, the request's remaining work is cancelled.
+    """
+    async def watch_disconnect():
+        while not cancel.cancelled:
+            await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+            if await http_request.is_disconnected():
+                cancel.cancel("client_disconnected")
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        watcher.cancel()
+        cancel.cancel("client_disconnected")  # no-op once the work has finished
+
 @app.post("/fact-check")
-async def fact_check(request: FactCheckRequest):
+async def fact_check(request: FactCheckRequest, http_request: Request):
     session_id = request.session_id or session_manager.create_session()
     session_manager.add_claim(session_id, request.claim)
 
+    if request.job:
+        job_id = job_queue.enqueue(request.claim, session_id=session_id,
+                                   force_refresh=request.force_refresh, deadline=request.deadline)
+        return JSONResponse({"job_id": job_id, "session_id": session_id, "status": "queued"}, status_code=202)
+
+    cancel = CancelToken(request.deadline or REQUEST_DEADLINE)
+
+    if request.stream == "events" or "text/event-stream" in http_request.headers.get("accept", ""):
+        def generate_fact_check_events(claim):
+            events = run_fact_check_events(claim, force_refresh=request.force_refresh, cancel=cancel)
+            for seq, event in enumerate(events):
+                payload = {"request_id": event["request_id"], "session_id": session_id, **event["data"]}
+                yield {"event": event["event"], "id": f"{event['request_id']}-{seq}", "data": json.dumps(payload)}
+
+        return EventSourceResponse(
+            stream_until_disconnect(generate_fact_check_events(request.claim), http_request, cancel)
+        )
+
     def generate_fact_check_stream(claim):
-        for chunk in run_fact_check_stream(claim, session_id):
+        for chunk in run_fact_check_stream(claim, session_id, force_refresh=request.force_refresh, cancel=cancel):
             yield chunk
 
-    return StreamingResponse(generate_fact_check_stream(request.claim), media_type="text/plain")
+    return StreamingResponse(stream_until_disconnect(generate_fact_check_stream(request.claim), http_request, cancel),
+                             media_type="text/plain")
+
+@app.post("/fact-check-batch")
+def fact_check_batch(request: BatchFactCheckRequest):
+    def generate_batch_results():
+        for result in run_fact_check_batch(request.claims):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(generate_batch_results(), media_type="application/x-ndjson")
 
 @app.post("/followup-stream")
-def followup_stream(request: FollowUpRequest):
+def followup_stream(request: FollowUpRequest, http_request: Request):
     session = session_manager.get_session(request.session_id)
-    claim = session_manager.get_session(request.session_id)['claim']
+    claim = session['claim']
+    cancel = CancelToken(REQUEST_DEADLINE)
+
+    def generate_followup_stream():
+        try:
+            yield from stream_followup(session, request.question, claim, cancel=cancel)
+            # The answer was appended to the history; persist it for the next question
+            session_manager.save_session(request.session_id, session)
+        finally:
+            cancel.close()
+
+    return StreamingResponse(stream_until_disconnect(generate_followup_stream(), http_request, cancel),
+                             media_type="text/plain")
+
+def get_job_or_404(job_id: str) -> dict:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, after: int = None):
+    """
+    Job status and result; with `after`, also the logged events past that sequence number.
+    """
+    job = get_job_or_404(job_id)
+    if after is not None:
+        job["events"] = job_queue.events(job_id, after)
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, http_request: Request, after: int = 0):
+    """
+    Server-sent events of a job, replayed from `after` (or the Last-Event-ID header) and
+    followed until the job finishes, ending with a `job_finished` event.
+    """
+    get_job_or_404(job_id)
+    try:
+        last_seen = int(http_request.headers.get("last-event-id") or after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be a job event sequence number")
+
+    async def follow():
+        nonlocal last_seen
+        while True:
+            job = await run_in_threadpool(job_queue.get, job_id)
+            for event in await run_in_threadpool(job_queue.events, job_id, last_seen):
+                last_seen = event["seq"]
+                payload = {"job_id": job_id, "attempt": event["attempt"], **event["data"]}
+                yield {"event": event["event"], "id": str(event["seq"]), "data": json.dumps(payload)}
+            if job["status"] in FINISHED_STATES and last_seen >= job["last_event"]:
+                yield {"event": "job_finished", "data": json.dumps(
+                    {key: job[key] for key in ("job_id", "status", "attempts", "result", "error")})}
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return EventSourceResponse(follow())
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return {"job_id": job_id, "cancelled": job_queue.cancel(job_id)}
+
+@app.get("/ready")
+def ready():
+    status = startup.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
-    return StreamingResponse(answer_followup(session, request.question, claim), media_type="text/plain")
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.post("/new-session")
 def new_session():
@@ -1,39 +1,145 @@
-import uuid
+import hashlib
+import json
+import math
+import os
+import re
 import shutil
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
+import threading
+import time
+from collections import OrderedDict
 
 DB_PATH = "./memory/chroma_db"
-db = chromadb.PersistentClient(path=DB_PATH, settings=Settings(anonymized_telemetry=False))
+# "host:port" of a Chroma server. Required when several processes (e.g. job workers) store
+# fact-checks: the embedded client at DB_PATH must only be opened by one process at a time.
+CHROMA_SERVER = os.getenv("FACTCHECK_CHROMA_SERVER")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_CACHE_SIZE = 4096   # texts whose embedding vectors are kept in memory
 
-embedder = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+# The client and the embedding model are created on first use (or by warm_up())
+_db = None
+_embedder = None
+_collection = None
+_claims_collection = None   # one row per checked claim, embedded on the claim text
+_init_lock = threading.Lock()
 
-collection = db.get_or_create_collection("fact_checks", embedding_function=embedder)
+_embedding_cache = OrderedDict()
+_embedding_cache_lock = threading.Lock()
 
-def store_fact_check(claim: str, summary: str, verdict: str, metadata: dict):
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _init_lock:
+            if _embedder is None:
+                # Imported here: chromadb pulls in sentence-transformers and transformers
+                from chromadb.utils import embedding_functions
+                _embedder = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
+    return _embedder
+
+
+def get_collection():
+    global _db, _collection, _claims_collection
+    if _collection is None:
+        embedder = get_embedder()
+        with _init_lock:
+            if _collection is None:
+                import chromadb
+                from chromadb.config import Settings
+                settings = Settings(anonymized_telemetry=False)
+                if CHROMA_SERVER:
+                    host, _, port = CHROMA_SERVER.rpartition(":")
+                    _db = chromadb.HttpClient(host=host, port=int(port), settings=settings)
+                else:
+                    _db = chromadb.PersistentClient(path=DB_PATH, settings=settings)
+                _claims_collection = _db.get_or_create_collection("fact_check_claims", embedding_function=embedder)
+                _collection = _db.get_or_create_collection("fact_checks", embedding_function=embedder)
+    return _collection
+
+
+def get_claims_collection():
+    get_collection()
+    return _claims_collection
+
+
+def warm_up():
     """
-    Store a new fact-check entry in the vector store.
+    Load the embedding model and open the Chroma client ahead of the first request.
     """
-    doc_id = str(hash(claim + summary))  # fallback ID
-    try:
-        # Prevent duplicate IDs on same hash
-        existing = collection.get(ids=[doc_id])
-        if existing and existing["ids"]:
-            doc_id = f"{doc_id}-{uuid.uuid4()}"
-    except Exception:
-        pass  # likely ID doesn't exist
-
-    collection.add(
-        documents=[summary],
-        metadatas=[{
+    get_collection()
+
+
+def embed_texts(texts: list) -> list:
+    """
+    Embed texts through an in-memory LRU, computing only the missing ones in a single batch.
+    """
+    vectors = {}
+    with _embedding_cache_lock:
+        for text in texts:
+            if text in _embedding_cache:
+                _embedding_cache.move_to_end(text)
+                vectors[text] = _embedding_cache[text]
+    missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+
+    if missing:
+        computed = [[float(x) for x in vector] for vector in get_embedder()(missing)]
+        with _embedding_cache_lock:
+            for text, vector in zip(missing, computed):
+                vectors[text] = _embedding_cache[text] = vector
+                _embedding_cache.move_to_end(text)
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+
+    return [vectors[text] for text in texts]
+
+def fact_check_id(claim: str, url: str, summary: str) -> str:
+    """
+    Stable content hash for a stored fact-check, identical across processes and restarts.
+    """
+    payload = json.dumps([claim, url, summary], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def store_fact_checks(claim: str, entries: list):
+    """
+    Store all judgments for a claim in one batch.
+    Each entry is a dict with "summary", "verdict" and optional "metadata" (url, title, ...).
+    Rows are upserted under content-hash IDs, so re-storing the same row is a no-op.
+    """
+    rows = {}
+    for entry in entries:
+        metadata = entry.get("metadata", {})
+        doc_id = fact_check_id(claim, metadata.get("url", ""), entry["summary"])
+        rows[doc_id] = (entry["summary"], {
             "claim": claim,
-            "verdict": verdict,
-            "summary": summary,
+            "verdict": entry["verdict"],
+            "summary": entry["summary"],
+            "checked_at": time.time(),
             **metadata
-        }],
-        ids=[doc_id]
+        })
+    if not rows:
+        return
+
+    documents = [doc for doc, _ in rows.values()]
+    get_collection().upsert(
+        ids=list(rows),
+        documents=documents,
+        embeddings=embed_texts(documents),
+        metadatas=[meta for _, meta in rows.values()]
     )
+    # Index the claim itself, so find_stored_verdicts can match claims against claims
+    get_claims_collection().upsert(
+        ids=[hashlib.sha256(claim.encode("utf-8")).hexdigest()],
+        documents=[claim],
+        embeddings=embed_texts([claim]),
+        metadatas=[{"claim": claim, "checked_at": time.time()}]
+    )
+
+
+def store_fact_check(claim: str, summary: str, verdict: str, metadata: dict):
+    """
+    Store a new fact-check entry in the vector store.
+    """
+    store_fact_checks(claim, [{"summary": summary, "verdict": verdict, "metadata": metadata}])
 
 
 def search_similar_claims(claim: str, top_k: int = 3):
@@ -41,7 +147,7 @@ def search_similar_claims(claim: str, top_k: int = 3):
     Search for previously fact-checked claims similar to the input.
     """
     try:
-        results = collection.query(query_texts=[claim], n_results=top_k)
+        results = get_collection().query(query_embeddings=embed_texts([claim]), n_results=top_k)
         if not results or not results.get("documents") or not results["documents"][0]:
             print("No matches found in memory.")
         return results
@@ -50,6 +156,67 @@ def search_similar_claims(claim: str, top_k: int = 3):
         return {}
 
 
+def cosine_similarity(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+_NEGATION = re.compile(r"\b(?:not|no|never|false|untrue|myth|debunked)\b|n't\b", re.IGNORECASE)
+
+
+def negated(text: str) -> bool:
+    """
+    Whether a claim reads as negated: an odd number of negation words. Embeddings of
+    "X" and "X is false" are close, so near-duplicates must also agree on this.
+    """
+    return len(_NEGATION.findall(text)) % 2 == 1
+
+
+def find_stored_verdicts(claim: str, min_similarity: float, max_age: float, candidates: int = 20) -> list:
+    """
+    Return stored judgments whose original claim is semantically close to `claim`.
+
+    Stored claims are searched by their own embedding; those reaching `min_similarity`
+    (cosine) against `claim` with the same negation polarity are kept, and their judgments
+    checked within `max_age` seconds are returned. One entry per URL, most similar first.
+    """
+    try:
+        claims = get_claims_collection()
+        claim_vector = embed_texts([claim])[0]
+        results = claims.query(
+            query_embeddings=[claim_vector],
+            n_results=min(candidates, max(claims.count(), 1)),
+            include=["metadatas"]
+        )
+        oldest = time.time() - max_age
+        stored = [m["claim"] for m in (results.get("metadatas") or [[]])[0]
+                  if m.get("claim") and m.get("checked_at", 0) >= oldest]
+        similarities = {
+            stored_claim: cosine_similarity(claim_vector, vector)
+            for stored_claim, vector in zip(stored, embed_texts(stored))
+        }
+        close = [c for c, similarity in similarities.items()
+                 if similarity >= min_similarity and negated(c) == negated(claim)]
+        if not close:
+            return []
+        rows = get_collection().get(where={"claim": {"$in": close}}, include=["documents", "metadatas"])
+    except Exception as e:
+        print(f" Memory lookup failed: {e}")
+        return []
+
+    matches = {}
+    for doc, meta in zip(rows.get("documents") or [], rows.get("metadatas") or []):
+        if meta.get("checked_at", 0) < oldest:
+            continue
+        similarity = similarities[meta["claim"]]
+        key = meta.get("url") or doc
+        if key not in matches or similarity > matches[key]["similarity"]:
+            matches[key] = {**meta, "summary": doc, "similarity": similarity}
+
+    return sorted(matches.values(), key=lambda m: m["similarity"], reverse=True)
+
+
 def format_results(docs, metas):
     """
     Format memory results for display.
@@ -64,9 +231,20 @@ def format_results(docs, metas):
 
 def reset_memory():
     """
-    Reset the local memory database by deleting stored fact-checks.
+    Reset the memory database by deleting stored fact-checks.
     """
-    shutil.rmtree(DB_PATH, ignore_errors=True)
+    global _db, _collection, _claims_collection
+    if CHROMA_SERVER:
+        get_collection()
+        for name in ("fact_checks", "fact_check_claims"):
+            try:
+                _db.delete_collection(name)
+            except Exception as e:
+                print(f"Could not delete {name}: {e}")
+    with _init_lock:
+        _db = _collection = _claims_collection = None
+    if not CHROMA_SERVER:
+        shutil.rmtree(DB_PATH, ignore_errors=True)
     print("Memory reset: All stored fact checks deleted.")
 
 
@@ -0,0 +1,345 @@
+# server/jobs.py
+"""
+Durable fact-check jobs: a SQLite-backed queue and the worker processes that drain it.
+
+The API enqueues a job and returns its id; workers (separate processes, see
+`start_workers` or `python -m server.jobs`) claim jobs under a time-limited lease,
+run the pipeline and append its events to the job's event log. A worker that dies
+stops renewing its lease, so the job is claimed again by another worker, up to
+JOB_MAX_ATTEMPTS times. Clients read the job row and its event log to follow progress.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_DB = "./memory/jobs.sqlite3"
+JOB_LEASE = 60              # seconds a claimed job stays reserved without a heartbeat
+JOB_HEARTBEAT = 15          # seconds between lease renewals while a job runs
+JOB_MAX_ATTEMPTS = 3        # runs of a job before it is marked failed
+JOB_RETRY_DELAY = 5         # seconds a failed job waits before it can be claimed again
+JOB_POLL_INTERVAL = 1.0     # seconds an idle worker waits before looking for work again
+PERSIST_TOKEN_EVENTS = False  # also log *_token events (one row per streamed chunk)
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+
+class JobQueue:
+    """
+    Jobs and their event logs in SQLite. Safe to share between threads, and between
+    processes that each open their own JobQueue on the same file.
+    """
+
+    def __init__(self, path: str = JOB_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        # Autocommit; claim() opens its own write transaction
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " claim TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " available_at REAL NOT NULL,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " job_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " attempt INTEGER NOT NULL,"
+            " event TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (job_id, seq))"
+        )
+
+    def enqueue(self, claim: str, **params) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, claim, params, status, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, claim, json.dumps(params), now, now, now)
+            )
+        return job_id
+
+    def claim(self, worker: str):
+        """
+        Lease the oldest runnable job to `worker`: a queued one, or a running one whose
+        worker stopped renewing its lease. Returns the job dict, or None if there is none.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs abandoned by a dead worker are cancelled if that was asked for,
+                # and given up on once they have no attempts left
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', error = 'cancelled', worker = NULL, updated_at = ?"
+                    " WHERE status = 'running' AND lease_until < ? AND cancel_requested = 1",
+                    (now, now)
+                )
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'worker lost', worker = NULL, updated_at = ?"
+                    " WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, JOB_MAX_ATTEMPTS)
+                )
+                row = self.conn.execute(
+                    "SELECT id FROM jobs"
+                    " WHERE cancel_requested = 0 AND ((status = 'queued' AND available_at <= ?)"
+                    " OR (status = 'running' AND lease_until < ?))"
+                    " ORDER BY created_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,"
+                        " lease_until = ?, updated_at = ? WHERE id = ?",
+                        (worker, now + JOB_LEASE, now, row[0])
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """
+        Renew `worker`'s lease on a job. False if the lease was lost or a cancel was requested.
+        """
+        with self.lock:
+            renewed = self.conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running' AND cancel_requested = 0",
+                (time.time() + JOB_LEASE, time.time(), job_id, worker)
+            ).rowcount
+        return renewed == 1
+
+    def add_event(self, job_id: str, attempt: int, event: str, data: dict) -> int:
+        with self.lock:
+            # One statement, so the next sequence number is taken under SQLite's write lock
+            cursor = self.conn.execute(
+                "INSERT INTO job_events (job_id, seq, attempt, event, data, created_at)"
+                " SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ?, ? FROM job_events WHERE job_id = ?",
+                (job_id, attempt, event, json.dumps(data), time.time(), job_id)
+            )
+            return self.conn.execute("SELECT seq FROM job_events WHERE rowid = ?", (cursor.lastrowid,)).fetchone()[0]
+
+    def finish(self, job_id: str, worker: str, status: str, result: dict = None, error: str = None):
+        """
+        Record the outcome of `worker`'s run. Ignored if the worker no longer holds the job.
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, worker = NULL, lease_until = NULL,"
+                " updated_at = ? WHERE id = ? AND worker = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, worker)
+            )
+
+    def retry(self, job_id: str, worker: str, error: str) -> bool:
+        """
+        Put a failed run back in the queue, or mark the job failed once its attempts are used up.
+        Returns True if it will be retried.
+        """
+        now = time.time()
+        with self.lock:
+            retried = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, worker = NULL, lease_until = NULL,"
+                " available_at = ?, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND attempts < ? AND cancel_requested = 0",
+                (error, now + JOB_RETRY_DELAY, now, job_id, worker, JOB_MAX_ATTEMPTS)
+            ).rowcount
+        if not retried:
+            self.finish(job_id, worker, "failed", error=error)
+        return retried == 1
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Ask for a job to be cancelled: queued jobs are cancelled at once, running ones by
+        their worker at its next heartbeat. False if the job is unknown or already finished.
+        """
+        now = time.time()
+        with self.lock:
+            changed = self.conn.execute(
+                "UPDATE jobs SET cancel_requested = 1,"
+                " status = CASE status WHEN 'queued' THEN 'cancelled' ELSE status END, updated_at = ?"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                (now, job_id)
+            ).rowcount
+        return changed == 1
+
+    def get(self, job_id: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, claim, params, status, attempts, worker, result, error, created_at, updated_at,"
+                " (SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = jobs.id)"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "claim": row[1],
+            "params": json.loads(row[2]),
+            "status": row[3],
+            "attempts": row[4],
+            "worker": row[5],
+            "result": json.loads(row[6]) if row[6] else None,
+            "error": row[7],
+            "created_at": row[8],
+            "updated_at": row[9],
+            "last_event": row[10],
+        }
+
+    def events(self, job_id: str, after: int = 0) -> list:
+        """
+        Events of a job with a sequence number above `after`, oldest first.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, attempt, event, data, created_at FROM job_events"
+                " WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after)
+            ).fetchall()
+        return [{"seq": seq, "attempt": attempt, "event": event, "data": json.loads(data), "time": created_at}
+                for seq, attempt, event, data, created_at in rows]
+
+    def count(self, status: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+
+def run_job(jobs: JobQueue, job: dict, worker: str):
+    """
+    Run one claimed job, logging its events and renewing the lease until it finishes.
+    """
+    # Imported here so the API process can enqueue jobs without loading the pipeline
+    from agents.pipeline import REQUEST_DEADLINE, run_fact_check_events
+    from tools.cancel import CancelToken
+
+    job_id, attempt, params = job["job_id"], job["attempts"], job["params"]
+    cancel = CancelToken(params.get("deadline") or REQUEST_DEADLINE)
+    stopped = threading.Event()
+
+    def keep_lease():
+        while not stopped.wait(JOB_HEARTBEAT):
+            if not jobs.heartbeat(job_id, worker):
+                cancel.cancel("job_cancelled")
+                return
+
+    threading.Thread(target=keep_lease, daemon=True).start()
+    print(f"[jobs] {worker} running job {job_id} (attempt {attempt}): {job['claim']}")
+    jobs.add_event(job_id, attempt, "job_started", {"attempt": attempt, "worker": worker})
+
+    result = error = None
+    cancelled_reason = None
+    try:
+        for event in run_fact_check_events(job["claim"], force_refresh=params.get("force_refresh", False),
+                                           cancel=cancel):
+            if event["event"] == "heartbeat":
+                continue
+            if event["event"].endswith("_token") and not PERSIST_TOKEN_EVENTS:
+                continue
+            jobs.add_event(job_id, attempt, event["event"], event["data"])
+            if event["event"] == "final_verdict":
+                result = event["data"]
+            elif event["event"] == "error":
+                error = event["data"]["message"]
+            elif event["event"] == "cancelled":
+                cancelled_reason = event["data"]["reason"]
+    except Exception as e:
+        error = str(e)
+    finally:
+        stopped.set()
+
+    if result is not None:
+        jobs.finish(job_id, worker, "done", result=result)
+    elif cancelled_reason == "job_cancelled":
+        jobs.finish(job_id, worker, "cancelled", error="cancelled")
+    elif cancelled_reason is not None:
+        jobs.finish(job_id, worker, "failed", error=f"cancelled ({cancelled_reason})")
+    else:
+        jobs.retry(job_id, worker, error or "finished without a verdict")
+    print(f"[jobs] Job {job_id} finished: {jobs.get(job_id)['status']}")
+
+
+def worker_main(path: str = JOB_DB, stop=None, name: str = None):
+    """
+    Claim and run jobs until `stop` (a multiprocessing Event) is set.
+    """
+    worker = name or f"{socket.gethostname()}-{os.getpid()}"
+    jobs = JobQueue(path)
+    print(f"[jobs] Worker {worker} started")
+    while stop is None or not stop.is_set():
+        job = jobs.claim(worker)
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+        try:
+            run_job(jobs, job, worker)
+        except Exception as e:
+            # Never let one job take the worker down; the lease lapses and it is retried
+            print(f"[jobs] Job {job['job_id']} crashed the runner: {e}")
+    print(f"[jobs] Worker {worker} stopped")
+
+
+def start_workers(count: int, path: str = JOB_DB):
+    """
+    Start `count` worker processes; returns (processes, stop event). Workers and the API
+    all store fact-checks, so they must share a Chroma server (FACTCHECK_CHROMA_SERVER).
+    """
+    from retriever import vector_store
+    if count > 0 and not vector_store.CHROMA_SERVER:
+        raise RuntimeError("Job workers need a Chroma server: set FACTCHECK_CHROMA_SERVER=host:port "
+                           "(e.g. after 'chroma run --path ./memory/chroma_db --port 8001')")
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    processes = [context.Process(target=worker_main, args=(path, stop), daemon=True) for _ in range(count)]
+    for process in processes:
+        process.start()
+    return processes, stop
+
+
+def stop_workers(processes, stop, timeout: float = 10):
+    """
+    Ask workers to stop after their current job; any still running after `timeout` are
+    terminated, and their jobs are picked up again once the lease lapses.
+    """
+    stop.set()
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run fact-check job workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--db", default=JOB_DB)
+    args = parser.parse_args()
+
+    processes, stop = start_workers(args.workers, args.db)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop_workers(processes, stop)
@@ -1,20 +1,164 @@
 # app/utils/session.py
+import json
+import os
+import sqlite3
+import threading
+import time
 import uuid
+from collections import OrderedDict
+
+SESSION_MAX_ENTRIES = 10000         # least recently used sessions beyond this are dropped
+SESSION_IDLE_TTL = 24 * 3600        # seconds of inactivity before a session expires
+SESSION_HISTORY_LIMIT = 50          # history messages kept per session
+
+
+class InMemorySessionBackend:
+    """
+    Sessions in a process-local dict, ordered from least to most recently used.
+    """
 
-class SessionManager:
     def __init__(self):
-        self.sessions = {}
+        self.sessions = OrderedDict()   # sid -> (session, last_seen)
+
+    def load(self, sid):
+        entry = self.sessions.get(sid)
+        if entry is None:
+            return None
+        self.sessions.move_to_end(sid)
+        return entry
+
+    def save(self, sid, session, last_seen):
+        self.sessions[sid] = (session, last_seen)
+        self.sessions.move_to_end(sid)
+
+    def touch(self, sid, last_seen):
+        session, _ = self.sessions[sid]
+        self.sessions[sid] = (session, last_seen)
+
+    def delete(self, sid):
+        self.sessions.pop(sid, None)
+
+    def evict(self, max_entries, expired_before):
+        evicted = 0
+        while self.sessions:
+            sid, (_, last_seen) = next(iter(self.sessions.items()))
+            if len(self.sessions) <= max_entries and last_seen >= expired_before:
+                break
+            del self.sessions[sid]
+            evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class SQLiteSessionBackend:
+    """
+    Sessions stored as JSON rows in SQLite, so several uvicorn workers can share them.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        self.conn.commit()
+
+    def load(self, sid):
+        with self.lock:
+            row = self.conn.execute("SELECT data, last_seen FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, session, last_seen):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, last_seen) VALUES (?, ?, ?)",
+                (sid, json.dumps(session), last_seen)
+            )
+            self.conn.commit()
+
+    def touch(self, sid, last_seen):
+        with self.lock:
+            self.conn.execute("UPDATE sessions SET last_seen = ? WHERE sid = ?", (last_seen, sid))
+            self.conn.commit()
+
+    def delete(self, sid):
+        with self.lock:
+            self.conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+            self.conn.commit()
+
+    def evict(self, max_entries, expired_before):
+        with self.lock:
+            evicted = self.conn.execute("DELETE FROM sessions WHERE last_seen < ?", (expired_before,)).rowcount
+            evicted += self.conn.execute(
+                "DELETE FROM sessions WHERE sid IN ("
+                " SELECT sid FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                (max_entries,)
+            ).rowcount
+            self.conn.commit()
+        return evicted
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class SessionManager:
+    def __init__(self, backend=None, max_entries: int = SESSION_MAX_ENTRIES,
+                 idle_ttl: float = SESSION_IDLE_TTL, history_limit: int = SESSION_HISTORY_LIMIT):
+        self.backend = backend if backend is not None else InMemorySessionBackend()
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.history_limit = history_limit
+        self.lock = threading.RLock()
 
     def create_session(self):
         sid = str(uuid.uuid4())
-        self.sessions[sid] = {"history": [], 'claim':None}
+        self.save_session(sid, {"history": [], 'claim':None})
         return sid
 
     def add_claim(self, sid, claim):
-        self.sessions[sid]["claim"] =  claim
+        with self.lock:
+            session = self.get_session(sid)
+            session["claim"] = claim
+            self.save_session(sid, session)
 
     def get_session(self, sid):
-        return self.sessions.get(sid, {"history": []})
+        with self.lock:
+            entry = self.backend.load(sid)
+            if entry is None:
+                return {"history": [], "claim": None}
+            session, last_seen = entry
+            now = time.time()
+            if now - last_seen > self.idle_ttl:
+                self.backend.delete(sid)
+                return {"history": [], "claim": None}
+            self.backend.touch(sid, now)
+            return session
+
+    def save_session(self, sid, session):
+        """
+        Persist a (possibly modified) session, trimming its history to the configured cap.
+        """
+        dropped = len(session.get("history", [])) - self.history_limit
+        if dropped > 0:
+            session["history"] = session["history"][dropped:]
+            # Keep the follow-up context's count of already summarized messages aligned
+            if session.get("summarized_count"):
+                session["summarized_count"] = max(0, session["summarized_count"] - dropped)
+        now = time.time()
+        with self.lock:
+            self.backend.save(sid, session, now)
+            self.backend.evict(self.max_entries, now - self.idle_ttl)
 
     def save_interaction(self, sid, role, content):
-        self.sessions[sid]["history"].append({"role": role, "content": content})
+        with self.lock:
+            session = self.get_session(sid)
+            session["history"].append({"role": role, "content": content})
+            self.save_session(sid, session)
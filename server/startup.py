@@ -0,0 +1,60 @@
+# server/startup.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from retriever import vector_store
+from tools import local_llm
+
+# Seconds spent per startup component, e.g. {"imports": 0.4, "llm_client": 1.2, "embedder": 3.1}
+startup_timings = {}
+startup_errors = {}
+_ready = threading.Event()
+_ready.set()  # nothing to wait for unless warm_up() is running
+
+
+def record_timing(component: str, seconds: float):
+    startup_timings[component] = round(seconds, 3)
+
+
+def _timed(component, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        print(f"[startup] Warm-up of {component} failed: {e}")
+        startup_errors[component] = str(e)
+    finally:
+        record_timing(component, time.perf_counter() - start)
+
+
+def warm_up():
+    """
+    Preload the LLM client and the embedding model / Chroma client in parallel,
+    recording how long each takes. The app reports ready once both have finished.
+    """
+    _ready.clear()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pool.submit(_timed, "llm_client", local_llm.warm_up)
+            pool.submit(_timed, "embedder", vector_store.warm_up)
+    finally:
+        record_timing("warm_up_total", time.perf_counter() - start)
+        _ready.set()
+
+
+def start_warm_up():
+    """
+    Run warm_up() in the background so the server accepts connections immediately.
+    """
+    _ready.clear()
+    threading.Thread(target=warm_up, daemon=True).start()
+
+
+def readiness() -> dict:
+    return {
+        "ready": _ready.is_set(),
+        "timings": dict(startup_timings),
+        "errors": dict(startup_errors),
+    }
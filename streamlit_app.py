@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import time
 
 # --- Configuration ---
@@ -8,6 +9,12 @@ FACT_CHECK_ENDPOINT = f"{BACKEND_URL}/fact-check"
 FOLLOWUP_ENDPOINT = f"{BACKEND_URL}/followup-stream"
 NEW_SESSION_ENDPOINT = f"{BACKEND_URL}/new-session"
 
+# --- Rendering ---
+USE_EVENT_STREAM = True  # request typed events and render each source's summary and judgment as its own element
+RENDER_FPS = 10          # max re-renders per second of text that is still streaming
+TYPING_EFFECT = False    # reveal streamed text character by character
+TYPING_DELAY = 0.01      # seconds per character when TYPING_EFFECT is on
+
 # --- Helper Functions ---
 
 def call_new_session():
@@ -20,7 +27,8 @@ def call_new_session():
         return None
 
 def call_fact_check_stream(claim: str, backend_session_id: str):
-    payload = {"claim": claim, "session_id": backend_session_id}
+    payload = {"claim": claim, "session_id": backend_session_id,
+               "stream": "events" if USE_EVENT_STREAM else "text"}
     try:
         response = requests.post(FACT_CHECK_ENDPOINT, json=payload, stream=True)
         response.raise_for_status()
@@ -39,6 +47,173 @@ def call_followup_stream(backend_session_id: str, question: str):
         st.error(f"Error asking follow-up: {e}")
         return None
 
+class ThrottledMarkdown:
+    """
+    Accumulates streamed text and redraws its placeholder at most RENDER_FPS times a second,
+    so long responses cost a bounded number of renders instead of one per character.
+    """
+
+    def __init__(self, placeholder, prefix=""):
+        self.placeholder = placeholder
+        self.prefix = prefix
+        self.text = ""
+        self.last_render = 0.0
+
+    def render(self, cursor=True):
+        body = (self.prefix + self.text).replace("\n", "<br>")
+        self.placeholder.markdown(body + ("▌" if cursor else ""), unsafe_allow_html=True)
+        self.last_render = time.monotonic()
+
+    def append(self, chunk):
+        if TYPING_EFFECT:
+            for char in chunk:
+                self.text += char
+                self._maybe_render()
+                time.sleep(TYPING_DELAY)
+        else:
+            self.text += chunk
+            self._maybe_render()
+
+    def _maybe_render(self):
+        if time.monotonic() - self.last_render >= 1 / RENDER_FPS:
+            self.render()
+
+    def finish(self, text=None):
+        if text is not None:
+            self.text = text
+        self.render(cursor=False)
+        return self.text
+
+
+def render_text_stream(response, placeholder):
+    """
+    Render a plain-text stream into `placeholder`; returns the full text.
+    """
+    view = ThrottledMarkdown(placeholder)
+    for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+        if chunk:
+            view.append(chunk)
+    return view.finish()
+
+
+def iter_sse_events(response):
+    """
+    Yield (event type, data dict) pairs from a server-sent event stream.
+    """
+    event_type, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event_type, json.loads("\n".join(data_lines))
+            event_type, data_lines = "message", []
+        elif line.startswith(":"):
+            continue  # keep-alive comment
+        elif line.startswith("event:"):
+            event_type = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip())
+    if data_lines:
+        yield event_type, json.loads("\n".join(data_lines))
+
+
+def render_event_stream(response):
+    """
+    Render fact-check events: a progress line, one element per source whose summary and
+    judgment stream in at RENDER_FPS and are drawn once more when complete, and the final
+    verdict. Returns a plain-text transcript for the chat history.
+    """
+    status = st.empty()
+    status.markdown("🌐 Searching the web...")
+    sources = {}    # source_id -> {"label", "summary": ThrottledMarkdown, "judgment": ThrottledMarkdown}
+    urls = {}       # source_id -> url, from search_done; token events carry only the source_id
+    total = 0
+    found = skipped = judged = 0
+    transcript = []
+
+    def source(data):
+        source_id = data["source_id"]
+        if source_id not in sources:
+            url = data.get("url") or urls.get(source_id, "")
+            box = st.container(border=True)
+            with box:
+                label = f"[{source_id}/{total}] {url}"
+                st.markdown(f"**{label}**")
+                sources[source_id] = {
+                    "label": label,
+                    "summary": ThrottledMarkdown(st.empty(), "🔍 "),
+                    "judgment": ThrottledMarkdown(st.empty(), "💡 "),
+                }
+        return sources[source_id]
+
+    def update_status():
+        status.markdown(f"🧠 {total} sources: {found} fetched, {skipped} skipped, {judged} judged")
+
+    for event_type, data in iter_sse_events(response):
+        if event_type == "search_done":
+            total = data["count"]
+            urls = {src["source_id"]: src["url"] for src in data.get("sources", [])}
+            transcript.append(f"🌐 Found {total} sources")
+            update_status()
+        elif event_type == "source_ok":
+            found += 1
+            source(data)
+            update_status()
+        elif event_type in ("summary_started", "judgment_started"):
+            source(data)
+        elif event_type == "source_skipped":
+            skipped += 1
+            transcript.append(f"Skipping source (unreachable or empty): {data['url']}")
+            update_status()
+        elif event_type in ("summary_token", "judgment_token"):
+            source(data)[event_type.split("_")[0]].append(data["text"])
+        elif event_type == "summary":
+            entry = source(data)
+            entry["summary"].finish(data["short_summary"])
+            transcript.append(f"🔍 Summary of {entry['label']}:\n{data['short_summary']}")
+        elif event_type == "judgment":
+            entry = source(data)
+            text = f"**Verdict: {data['verdict']}**\n{data['reason']}"
+            entry["judgment"].finish(text)
+            judged += 1
+            transcript.append(f"💡 Judgment for {entry['label']}:\nVerdict: {data['verdict']}\nReason: {data['reason']}")
+            update_status()
+        elif event_type == "source_failed":
+            entry = source(data)
+            entry["judgment"].finish(f"⚠️ Could not evaluate this source: {data['error']}")
+            transcript.append(f"⚠️ Could not evaluate {entry['label']}: {data['error']}")
+        elif event_type == "early_stop":
+            text = f"⏩ Verdict settled ({data['verdict']}) after {data['evaluated']} sources; " + \
+                f"skipping the rest (up to {data['remaining']} sources)"
+            for entry in sources.values():
+                for kind in ("summary", "judgment"):
+                    if entry[kind].text:
+                        entry[kind].finish()   # drop the cursor of text cut off mid-stream
+            st.markdown(text)
+            transcript.append(text)
+        elif event_type == "memory_hit":
+            status.markdown(f"🗂️ Found {data['count']} stored judgments for this claim, answering from memory")
+            for m in data["matches"]:
+                text = f"💾 Stored judgment for {m.get('url') or 'unknown source'}\n" + \
+                    f"Past claim: {m['claim']}\nVerdict: {m['verdict']}" + \
+                    (f"\nReason: {m['reason']}" if m.get("reason") else "")
+                st.markdown(text.replace("\n", "<br>"), unsafe_allow_html=True)
+                transcript.append(text)
+        elif event_type == "final_verdict":
+            title = "📊 Final Verdict (from memory):" if data["from_memory"] else "📊 Final Verdict:"
+            text = f"{title}\n{data['text']}"
+            st.markdown(text.replace("\n", "<br>"), unsafe_allow_html=True)
+            transcript.append(text)
+        elif event_type == "error":
+            st.error(f"Fact-check failed: {data['message']}")
+            transcript.append(f"❌ Fact-check failed: {data['message']}")
+        elif event_type == "cancelled":
+            st.error(f"Fact-check cancelled ({data['reason']})")
+            transcript.append(f"⛔ Fact-check cancelled ({data['reason']})")
+
+    return "\n".join(transcript)
+
 # --- Streamlit App ---
 
 st.set_page_config(page_title="FactChecker AI", layout="wide", page_icon="🧐")
@@ -123,15 +298,13 @@ else:
 
                     # Stream assistant message
                     with st.chat_message("assistant"):
-                        placeholder = st.empty()
-                        full_response = ""
-                        for chunk in stream_response.iter_content(chunk_size=1024, decode_unicode=True):
-                            if chunk:
-                                for char in chunk:
-                                    full_response += char
-                                    placeholder.markdown(full_response.replace("\n", "<br>") + "▌", unsafe_allow_html=True)
-                                    time.sleep(0.01)  # Typing speed
-                        stream_response.close()
+                        try:
+                            if USE_EVENT_STREAM:
+                                full_response = render_event_stream(stream_response)
+                            else:
+                                full_response = render_text_stream(stream_response, st.empty())
+                        finally:
+                            stream_response.close()
 
 
                     session_data["initial_result"] = full_response
@@ -173,12 +346,7 @@ else:
 
                 if stream_response:
                     try:
-                        for chunk in stream_response.iter_content(chunk_size=1024, decode_unicode=True):
-                            if chunk:
-                                for char in chunk:
-                                    full_response += char
-                                    placeholder.markdown(full_response.replace("\n", "<br>") + "▌", unsafe_allow_html=True)
-                                    time.sleep(0.01)  # Typing speed
+                        full_response = render_text_stream(stream_response, placeholder)
                     except Exception as e:
                         st.error(f"Error processing stream: {e}")
                         full_response = "[Error receiving response]"
@@ -0,0 +1,55 @@
+import threading
+import time
+
+from tools.cancel import CancelToken
+from tools.fetch_sources import iter_fetch
+
+URLS = ["http://a.example/1", "http://a.example/2", "http://b.example/1"]
+
+
+def quick_fetch(url, max_length=4000, timeout=None):
+    time.sleep(0.01)
+    return f"text of {url}"
+
+
+def test_iter_fetch_returns_once_every_url_is_done_with_a_cancel_token():
+    cancel = CancelToken()
+    started = time.monotonic()
+    results = dict(iter_fetch(URLS, deadline=5, fetch=quick_fetch, cancel=cancel))
+    elapsed = time.monotonic() - started
+    cancel.close()
+
+    assert results == {url: f"text of {url}" for url in URLS}
+    assert elapsed < 1
+
+
+def test_iter_fetch_stops_when_cancelled():
+    release = threading.Event()
+
+    def blocked_fetch(url, max_length=4000, timeout=None):
+        release.wait(5)
+        return "late"
+
+    cancel = CancelToken()
+    threading.Timer(0.1, cancel.cancel, args=("test",)).start()
+    started = time.monotonic()
+    results = list(iter_fetch(URLS, deadline=5, fetch=blocked_fetch, cancel=cancel))
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert results == []
+    assert elapsed < 1
+
+
+def test_iter_fetch_gives_up_at_the_deadline():
+    release = threading.Event()
+
+    def slow_fetch(url, max_length=4000, timeout=None):
+        if url == URLS[0]:
+            release.wait(5)
+        return "ok"
+
+    results = dict(iter_fetch(URLS, deadline=0.3, fetch=slow_fetch))
+    release.set()
+
+    assert results == {URLS[0]: "", URLS[1]: "ok", URLS[2]: "ok"}
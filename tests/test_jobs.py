@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from server import jobs
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE", 0.05)
+    return jobs.JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_job_of_a_lost_worker_is_claimed_again(queue):
+    job_id = queue.enqueue("claim")
+    assert queue.claim("w1")["job_id"] == job_id
+    time.sleep(0.1)
+
+    job = queue.claim("w2")
+    assert job["job_id"] == job_id
+    assert job["attempts"] == 2
+
+    queue.finish(job_id, "w1", "failed", error="late")   # the lost worker no longer holds it
+    assert queue.get(job_id)["status"] == "running"
+
+
+def test_cancelled_job_of_a_lost_worker_is_not_claimed_again(queue):
+    job_id = queue.enqueue("claim")
+    queue.claim("w1")
+    assert queue.cancel(job_id)
+    time.sleep(0.1)
+
+    assert queue.claim("w2") is None
+    assert queue.get(job_id)["status"] == "cancelled"
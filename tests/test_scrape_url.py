@@ -0,0 +1,59 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+
+from tools import scrape_url as scrape
+from tools.disk_cache import DiskCache
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    body = b""
+    hits = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        try:
+            self.wfile.write(self.body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stops reading at the download cap
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape, "scrape_cache", DiskCache("scrape_cache", path=str(tmp_path / "scrape.sqlite3")))
+    handler = type("Handler", (PageHandler,), {"hits": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}/page"
+    server.shutdown()
+
+
+def test_page_cut_by_download_cap_is_served_from_cache(page):
+    handler, url = page
+    filler = "<div></div>" * (scrape.MAX_DOWNLOAD_BYTES // 10)
+    handler.body = f"<html><body><p>Short article.</p>{filler}</body></html>".encode()
+
+    texts = [scrape.scrape_url(url, max_length=4000) for _ in range(3)]
+
+    assert texts == ["Short article."] * 3
+    assert handler.hits == 1
+
+
+def test_page_cut_at_max_length_is_refetched_for_a_longer_request(page):
+    handler, url = page
+    handler.body = ("<html><body>" + "<p>word</p>" * 2000 + "</body></html>").encode()
+
+    assert len(scrape.scrape_url(url, max_length=100)) <= 100
+    assert len(scrape.scrape_url(url, max_length=50)) <= 50
+    assert handler.hits == 1
+
+    assert len(scrape.scrape_url(url, max_length=4000)) > 100
+    assert handler.hits == 2
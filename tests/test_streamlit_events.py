@@ -0,0 +1,88 @@
+import importlib
+import json
+import sys
+from unittest import mock
+
+import pytest
+
+
+def sse(events) -> str:
+    """
+    Serialize (event, data) pairs the way /fact-check streams them.
+    """
+    return "".join(f"event: {event}\r\nid: r1-{seq}\r\ndata: {json.dumps({'request_id': 'r1', **data})}\r\n\r\n"
+                   for seq, (event, data) in enumerate(events))
+
+
+class Response:
+    def __init__(self, body: str):
+        self.body = body
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.body.splitlines())
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """
+    streamlit_app imported against a mock streamlit module, so rendering can be inspected.
+    """
+    st = mock.MagicMock()
+    st.button.return_value = False
+    st.chat_input.return_value = None
+    monkeypatch.setitem(sys.modules, "streamlit", st)
+    monkeypatch.delitem(sys.modules, "streamlit_app", raising=False)
+    module = importlib.import_module("streamlit_app")
+    st.reset_mock()
+    yield module, st
+    sys.modules.pop("streamlit_app", None)
+
+
+SOURCES = [{"source_id": 1, "url": "http://a.example/1", "title": "A"},
+           {"source_id": 2, "url": "http://b.example/2", "title": "B"}]
+
+
+def test_render_event_stream_renders_a_streamed_fact_check(app):
+    module, st = app
+    body = sse([
+        ("search_started", {"claim": "The earth is round"}),
+        ("search_done", {"count": 2, "sources": SOURCES}),
+        ("source_ok", {"source_id": 1, "url": "http://a.example/1"}),
+        ("summary_started", {"source_id": 1, "url": "http://a.example/1"}),
+        ("summary_token", {"source_id": 1, "text": "Round, "}),
+        ("summary_token", {"source_id": 1, "text": "says NASA."}),
+        # Tokens of a source that had no earlier event still find its URL
+        ("summary_token", {"source_id": 2, "text": "Also round."}),
+        ("summary", {"source_id": 1, "url": "http://a.example/1", "short_summary": "Round, says NASA."}),
+        ("judgment_started", {"source_id": 1, "url": "http://a.example/1"}),
+        ("judgment_token", {"source_id": 1, "text": "Verdict: Supports"}),
+        ("judgment", {"source_id": 1, "url": "http://a.example/1", "verdict": "Supports",
+                      "confidence": 90, "reason": "Satellite images."}),
+        ("heartbeat", {"time": 0}),
+        ("final_verdict", {"verdict": "Supports", "text": "Final Verdict for claim: Supports\n",
+                           "from_memory": False}),
+    ])
+
+    transcript = module.render_event_stream(Response(body))
+
+    assert "🔍 Summary of [1/2] http://a.example/1:\nRound, says NASA." in transcript
+    assert "💡 Judgment for [1/2] http://a.example/1:\nVerdict: Supports\nReason: Satellite images." in transcript
+    assert "📊 Final Verdict:\nFinal Verdict for claim: Supports" in transcript
+    labels = [c.args[0] for c in st.markdown.call_args_list]
+    assert "**[1/2] http://a.example/1**" in labels
+    assert "**[2/2] http://b.example/2**" in labels
+    st.error.assert_not_called()
+
+
+def test_render_event_stream_reports_cancellation(app):
+    module, st = app
+    body = sse([
+        ("search_done", {"count": 1, "sources": SOURCES[:1]}),
+        ("source_ok", {"source_id": 1, "url": "http://a.example/1"}),
+        ("cancelled", {"reason": "deadline"}),
+    ])
+
+    transcript = module.render_event_stream(Response(body))
+
+    st.error.assert_called_once_with("Fact-check cancelled (deadline)")
+    assert transcript.endswith("⛔ Fact-check cancelled (deadline)")
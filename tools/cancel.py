@@ -0,0 +1,105 @@
+# tools/cancel.py
+"""
+Request-scoped cancellation, shared by the fetch pool, the LLM scheduler and the pipeline.
+"""
+import threading
+
+from tools.telemetry import cancellations
+
+
+class Cancelled(Exception):
+    """
+    Raised inside work whose request was cancelled (client gone or deadline passed).
+    """
+
+
+class CancelToken:
+    """
+    Set once when a request is abandoned. Work checks `cancelled` (or calls `check()`)
+    between steps; blocking waits register `on_cancel` callbacks to be woken up.
+    With `deadline` (seconds) the token cancels itself when the time is up.
+    """
+
+    def __init__(self, deadline: float = None):
+        self.reason = None
+        self.report = True    # log and count cancellations; off for child tokens
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._closed = False
+        self._timer = None
+        self._detach = None   # unregisters a child token from its parent
+        if deadline:
+            self._timer = threading.Timer(deadline, self.cancel, args=("deadline",))
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancel the request; returns False if it was already cancelled or had finished.
+        """
+        with self._lock:
+            if self._closed or self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        if self.report:
+            cancellations.inc(reason=reason)
+            print(f"[cancel] Request cancelled: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[cancel] Cancel callback failed: {e}")
+        return True
+
+    def close(self):
+        """
+        Mark the request as finished: later cancel() calls, including the deadline, do nothing.
+        """
+        with self._lock:
+            self._closed = True
+            self._callbacks = []
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._detach is not None:
+            self._detach()
+
+    def child(self):
+        """
+        A token for part of the request's work: cancelled with this one, but cancelling
+        it (e.g. to stop early) leaves the request alone. Close it when that work is done.
+        """
+        token = CancelToken()
+        token.report = False
+        token._detach = self.on_cancel(lambda: token.cancel(self.reason))
+        return token
+
+    def on_cancel(self, callback):
+        """
+        Call `callback` once when the token is cancelled (right away if it already is).
+        Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+
+        def remove():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return remove
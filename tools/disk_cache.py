@@ -0,0 +1,156 @@
+# tools/disk_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+
+from tools.telemetry import cache_events
+
+CACHE_DIR = "./memory"
+
+CacheEntry = namedtuple("CacheEntry", ["value", "meta", "fresh"])
+
+
+class DiskCache:
+    """
+    Small persistent key/value cache on SQLite with per-entry TTL and LRU eviction.
+
+    Values and metadata are stored as JSON. Expired entries are kept until evicted,
+    so callers can revalidate them (see `get_entry`) instead of refetching from scratch.
+    """
+
+    def __init__(self, name: str, ttl: float = 3600, max_entries: int = 1000,
+                 max_bytes: int = None, path: str = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path or os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.stats = Counter()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " meta TEXT,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_entry(self, key: str):
+        """
+        Return a CacheEntry (fresh or expired) for `key`, or None if it isn't cached.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, meta, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.count("misses")
+                return None
+            now = time.time()
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+
+        fresh = row[2] > now
+        self.count("hits" if fresh else "stale")
+        return CacheEntry(json.loads(row[0]), json.loads(row[1]) if row[1] else {}, fresh)
+
+    def count(self, event: str, amount: int = 1):
+        """
+        Bump a cache counter, both in `stats` and in the exported metrics.
+        """
+        self.stats[event] += amount
+        cache_events.inc(amount, cache=self.name, event=event)
+
+    def get(self, key: str, default=None):
+        """
+        Return the cached value for `key` if present and not expired.
+        """
+        entry = self.get_entry(key)
+        if entry is None or not entry.fresh:
+            return default
+        return entry.value
+
+    def set(self, key: str, value, meta: dict = None, ttl: float = None):
+        encoded = json.dumps(value)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, meta, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, json.dumps(meta) if meta else None, len(encoded), expires_at, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def refresh(self, key: str, meta: dict = None, ttl: float = None):
+        """
+        Mark an existing entry as fresh again, e.g. after a successful revalidation.
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            conn = self._connect()
+            if meta is None:
+                conn.execute("UPDATE entries SET expires_at = ? WHERE key = ?", (expires_at, key))
+            else:
+                conn.execute("UPDATE entries SET expires_at = ?, meta = ? WHERE key = ?",
+                             (expires_at, json.dumps(meta), key))
+            conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+    def _evict(self, conn):
+        """
+        Drop least recently used entries until both size bounds hold.
+        """
+        evicted = 0
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        while count and ((self.max_entries and count > self.max_entries) or
+                         (self.max_bytes and total > self.max_bytes)):
+            key, size = conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        if evicted:
+            self.count("evictions", evicted)
+
+    def info(self) -> dict:
+        """
+        Counters plus current entry count and stored size in bytes.
+        """
+        with self._lock:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"name": self.name, "entries": count, "bytes": total, **self.stats}
@@ -0,0 +1,85 @@
+# tools/fetch_sources.py
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from urllib.parse import urlparse
+
+from tools.scrape_url import scrape_url, REQUEST_TIMEOUT
+from tools.telemetry import timeouts
+
+MAX_WORKERS = 8        # sources fetched in parallel per claim
+PER_HOST_LIMIT = 2     # concurrent requests against a single host
+FETCH_DEADLINE = 20    # seconds allowed for the whole batch of sources
+
+
+def iter_fetch(urls, max_length: int = 4000, max_workers: int = MAX_WORKERS,
+               per_host: int = PER_HOST_LIMIT, deadline: float = FETCH_DEADLINE, fetch=None,
+               cancel=None):
+    """
+    Fetch and extract every URL concurrently, yielding (url, text) in completion order.
+    Each distinct URL is downloaded once. URLs that fail or miss the deadline yield "".
+    `fetch` replaces scrape_url, e.g. to share downloads between several claims.
+    Once `cancel` fires, queued downloads are dropped and iteration stops.
+    """
+    fetch = fetch or partial(scrape_url, cancel=cancel)
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return
+
+    expires_at = time.monotonic() + deadline
+    host_slots = {}
+    for url in unique_urls:
+        host = urlparse(url).netloc
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(per_host)
+
+    def fetch_one(url):
+        slot = host_slots[urlparse(url).netloc]
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0 or not slot.acquire(timeout=remaining):
+            return ""
+        try:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0 or (cancel is not None and cancel.cancelled):
+                return ""
+            return fetch(url, max_length=max_length, timeout=min(REQUEST_TIMEOUT, remaining))
+        finally:
+            slot.release()
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(unique_urls)))
+    futures = {executor.submit(fetch_one, url): url for url in unique_urls}
+    not_done = set(futures)
+    pending = set(unique_urls)
+    wake = set()
+    remove_callback = None
+    if cancel is not None:
+        # Resolves when the request is cancelled, only to cut the wait below short
+        cancelled = Future()
+        remove_callback = cancel.on_cancel(lambda: cancelled.set_result(None))
+        wake.add(cancelled)
+    try:
+        while not_done:
+            remaining = expires_at - time.monotonic()
+            done = set()
+            if remaining > 0:
+                done, _ = wait(not_done | wake, timeout=remaining, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.cancelled:
+                return
+            done -= wake
+            if not done:
+                timeouts.inc(len(pending), stage="fetch_deadline")
+                print(f"[fetch_sources] Deadline reached, {len(pending)} source(s) still pending")
+                break
+            for future in done:
+                not_done.discard(future)
+                pending.discard(futures[future])
+                yield futures[future], future.result()
+    finally:
+        if remove_callback is not None:
+            remove_callback()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for url in pending:
+        yield url, ""
+
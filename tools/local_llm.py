@@ -1,38 +1,263 @@
 # tools/local_llm.py
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 
-from langchain_community.llms import Ollama
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
+from tools.cancel import Cancelled
+from tools.disk_cache import DiskCache
+from tools.telemetry import llm_queue_wait, llm_requests, llm_tokens, registry, span
 
 MODEL = "mistral"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+GENERATION_OPTIONS = {}   # extra Ollama parameters, e.g. {"temperature": 0}
 
-# Create an Ollama LLM instance
-llm = Ollama(model=MODEL)
+LLM_CACHE_TTL = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 20000
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
 
+MAX_IN_FLIGHT = 2          # generations allowed to run against Ollama at once
 
-def local_llm_ask(prompt: str, system_prompt: str = None) -> str:
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0   # follow-up answers a user is waiting on
+PRIORITY_BACKGROUND = 10   # summarize / judge work inside a fact-check
+
+DEFAULT_TEMPLATE = "You are a helpful assistant. Answer the following query:\n\n{query}"
+
+# Ollama LLM instance shared by every call, created on first use (or by warm_up())
+_llm = None
+_llm_lock = threading.Lock()
+
+# Completions keyed by (model, rendered prompt, generation options)
+llm_cache = DiskCache("llm_cache", ttl=LLM_CACHE_TTL,
+                      max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES)
+
+
+class LLMScheduler:
+    """
+    Admits at most `max_in_flight` generations at a time. Waiting requests are served
+    by priority, then in arrival order, so interactive calls overtake queued bulk work.
+    A waiting request whose cancel token fires leaves the queue and raises Cancelled.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._waiting = []
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+        self._wait_stats = {}
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_BACKGROUND, cancel=None):
+        ticket = (priority, next(self._tickets))
+        queued_at = time.monotonic()
+        remove_callback = cancel.on_cancel(self._wake) if cancel is not None else None
+        try:
+            with self._cond:
+                heapq.heappush(self._waiting, ticket)
+                while self.in_flight >= self.max_in_flight or self._waiting[0] != ticket:
+                    if cancel is not None and cancel.cancelled:
+                        self._waiting.remove(ticket)
+                        heapq.heapify(self._waiting)
+                        self._cond.notify_all()
+                        raise Cancelled(cancel.reason)
+                    self._cond.wait()
+                heapq.heappop(self._waiting)
+                self.in_flight += 1
+                self._record_wait(priority, time.monotonic() - queued_at)
+                self._cond.notify_all()
+        finally:
+            if remove_callback is not None:
+                remove_callback()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _record_wait(self, priority, waited):
+        stats = self._wait_stats.setdefault(priority, {"served": 0, "total_wait": 0.0, "max_wait": 0.0})
+        stats["served"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        llm_queue_wait.observe(waited, priority=priority)
+
+    def stats(self) -> dict:
+        """
+        Current queue depth and in-flight count, plus wait times per priority class.
+        """
+        with self._cond:
+            return {
+                "queue_depth": len(self._waiting),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "priorities": {
+                    priority: {
+                        "served": s["served"],
+                        "avg_wait": s["total_wait"] / s["served"],
+                        "max_wait": s["max_wait"],
+                    }
+                    for priority, s in self._wait_stats.items()
+                },
+            }
+
+
+llm_scheduler = LLMScheduler()
+
+registry.gauge("factcheck_llm_queue_depth", "LLM calls waiting for a generation slot",
+               lambda: llm_scheduler.stats()["queue_depth"])
+registry.gauge("factcheck_llm_in_flight", "LLM generations currently running",
+               lambda: llm_scheduler.stats()["in_flight"])
+
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                # Imported here so importing this module doesn't pull in LangChain
+                from langchain_community.llms import Ollama
+                _llm = Ollama(model=MODEL, base_url=OLLAMA_BASE_URL, **GENERATION_OPTIONS)
+    return _llm
+
+
+def warm_up():
+    """
+    Import LangChain and create the Ollama client ahead of the first request.
+    """
+    get_llm()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cheap token estimate: words and punctuation marks, the way BPE tokenizers mostly split them.
+    """
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def completion_cache_key(prompt: str) -> str:
+    payload = json.dumps({"model": MODEL, "prompt": prompt, "options": GENERATION_OPTIONS}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_prompt(prompt_text: str, template: str = None) -> str:
+    """
+    Fill the {query} slot of a template. Other braces are left alone, so templates
+    pre-formatted with article text or chat history can't break the rendering.
+    """
+    return (template or DEFAULT_TEMPLATE).replace("{query}", prompt_text)
+
+
+def _record_generation(prompt: str, answer: str):
+    llm_requests.inc(result="generated")
+    llm_tokens.inc(count_tokens(prompt), direction="in")
+    llm_tokens.inc(count_tokens(answer), direction="out")
+
+
+def _generate(prompt: str, priority: int, cancel=None):
+    """
+    Yield the answer's chunks while holding a scheduler slot. With a cancel token the
+    generation is abandoned between chunks once it fires; closing the stream drops the
+    connection, which makes Ollama stop generating.
+    """
+    with llm_scheduler.slot(priority, cancel), span("llm_generate"):
+        stream = get_llm().stream(prompt)
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.cancelled:
+                    llm_requests.inc(result="cancelled")
+                    raise Cancelled(cancel.reason)
+                yield chunk
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+
+def _complete(prompt: str, use_cache: bool, priority: int, cancel=None) -> str:
+    key = completion_cache_key(prompt)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            llm_requests.inc(result="cached")
+            return cached
+
+    if cancel is None:
+        with llm_scheduler.slot(priority), span("llm_generate"):
+            answer = get_llm().invoke(prompt)
+    else:
+        # Streamed internally so a cancelled request stops using the model right away
+        answer = "".join(_generate(prompt, priority, cancel))
+    _record_generation(prompt, answer)
+    llm_cache.set(key, answer)
+    return answer
+
+
+def local_llm_ask(prompt: str, system_prompt: str = None, use_cache: bool = True,
+                  priority: int = PRIORITY_BACKGROUND, cancel=None) -> str:
     """
     Ask the local LLM using a simple prompt (optionally with a system message).
+    Pass use_cache=False to force a fresh generation (the result still refreshes the cache).
+    A `cancel` token aborts the call, queued or generating, with Cancelled.
     """
     if system_prompt:
         prompt = f"{system_prompt}\n\n{prompt}"
-    return llm.invoke(prompt)
+    return _complete(prompt, use_cache, priority, cancel)
+
+
+def local_llm_chain_ask(prompt_text: str, template: str = None, use_cache: bool = True,
+                        on_token=None, priority: int = PRIORITY_BACKGROUND, cancel=None) -> str:
+    """
+    Ask the local LLM with a prompt template whose {query} slot is filled with `prompt_text`.
+    Identical rendered prompts are answered from the completion cache unless use_cache=False.
+    When `on_token` is given the answer is streamed and each chunk is passed to it as it arrives.
+    """
+    if on_token is not None:
+        chunks = []
+        for chunk in local_llm_stream(prompt_text, template=template, use_cache=use_cache,
+                                      priority=priority, cancel=cancel):
+            chunks.append(chunk)
+            on_token(chunk)
+        return "".join(chunks)
+
+    return _complete(render_prompt(prompt_text, template), use_cache, priority, cancel)
 
 
-def local_llm_chain_ask(prompt_text: str, template: str = None) -> str:
+def local_llm_stream(prompt_text: str, template: str = None, use_cache: bool = True,
+                     priority: int = PRIORITY_BACKGROUND, cancel=None):
     """
-    Use LangChain's prompt templating system for more structured prompts.
+    Same prompt handling as local_llm_chain_ask, but yields the answer in chunks as Ollama
+    generates them. A cached answer is yielded in one piece; a fresh one is cached only
+    once the generation has run to completion.
     """
-    if template is None:
-        template = "You are a helpful assistant. Answer the following query:\n\n{query}"
+    prompt = render_prompt(prompt_text, template)
 
-    prompt = PromptTemplate(
-        input_variables=["query"],
-        template=template
-    )
+    key = completion_cache_key(prompt)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            llm_requests.inc(result="cached")
+            yield cached
+            return
 
-    chain = LLMChain(llm=llm, prompt=prompt)
-    return chain.run(query=prompt_text)
+    chunks = []
+    for chunk in _generate(prompt, priority, cancel):
+        chunks.append(chunk)
+        yield chunk
+    answer = "".join(chunks)
+    _record_generation(prompt, answer)
+    llm_cache.set(key, answer)
 
 
 if __name__ == "__main__":
@@ -40,7 +265,7 @@ if __name__ == "__main__":
     response = local_llm_ask("Can you write code?")
     print("Direct response:\n", response)
 
-    # Example with LangChain prompt template
+    # Example with a prompt template
     template = "Rewrite the following text to make it more professional:\n\n{query}"
     chain_response = local_llm_chain_ask("hey there! i want u to help", template)
-    print("LangChain templated response:\n", chain_response)
+    print("Templated response:\n", chain_response)
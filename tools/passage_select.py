@@ -0,0 +1,107 @@
+# tools/passage_select.py
+import math
+import re
+from collections import Counter
+
+from tools.local_llm import count_tokens
+
+PASSAGE_CHARS = 600            # target size of one passage
+PASSAGE_TOKEN_BUDGET = 900     # tokens of selected passages handed to the reader agent
+USE_EMBEDDINGS = False         # blend MiniLM similarity into the BM25 ranking
+EMBEDDING_WEIGHT = 0.5
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+
+def _terms(text: str) -> list:
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, size: int = PASSAGE_CHARS) -> list:
+    """
+    Group consecutive lines into passages of roughly `size` characters.
+    Lines longer than `size` are split on sentence boundaries.
+    """
+    pieces = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) <= size:
+            pieces.append(line)
+        else:
+            pieces.extend(s for s in re.split(r"(?<=[.!?])\s+", line) if s)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > size:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def bm25_scores(query: str, chunks: list, k1: float = 1.5, b: float = 0.75) -> list:
+    query_terms = set(_terms(query))
+    docs = [Counter(_terms(chunk)) for chunk in chunks]
+    if not query_terms or not docs:
+        return [0.0] * len(chunks)
+
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1
+    doc_freq = {t: sum(1 for d in docs if t in d) for t in query_terms}
+    scores = []
+    for d in docs:
+        length = sum(d.values())
+        score = 0.0
+        for t in query_terms:
+            if t not in d:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[t] + 0.5) / (doc_freq[t] + 0.5))
+            score += idf * d[t] * (k1 + 1) / (d[t] + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def _embedding_scores(query: str, chunks: list) -> list:
+    from retriever.vector_store import embed_texts, cosine_similarity
+    vectors = embed_texts([query] + chunks)
+    return [cosine_similarity(vectors[0], v) for v in vectors[1:]]
+
+
+def select_passages(text: str, claim: str, token_budget: int = PASSAGE_TOKEN_BUDGET,
+                    use_embeddings: bool = USE_EMBEDDINGS) -> str:
+    """
+    Keep the passages of `text` most relevant to `claim`, up to `token_budget` tokens,
+    in their original order. Text already within budget is returned unchanged.
+    """
+    if count_tokens(text) <= token_budget:
+        return text
+    chunks = chunk_text(text)
+    if not chunks:
+        return text
+
+    scores = bm25_scores(claim, chunks)
+    if use_embeddings:
+        top = max(scores) or 1.0
+        similarities = _embedding_scores(claim, chunks)
+        scores = [(1 - EMBEDDING_WEIGHT) * s / top + EMBEDDING_WEIGHT * sim
+                  for s, sim in zip(scores, similarities)]
+
+    ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+    selected, used = [], 0
+    for i in ranked:
+        tokens = count_tokens(chunks[i])
+        if used + tokens > token_budget:
+            continue
+        selected.append(i)
+        used += tokens
+    if not selected:
+        selected = ranked[:1]
+
+    return "\n\n".join(chunks[i] for i in sorted(selected))
@@ -1,44 +1,260 @@
 # tools/scrape_url.py
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+import codecs
 import re
+import threading
+from html.parser import HTMLParser
 
-def scrape_url(url: str, max_length: int = 4000) -> str:
-    try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
+from tools.cancel import Cancelled
+from tools.disk_cache import DiskCache
+from tools.telemetry import span, timeouts
+
+REQUEST_TIMEOUT = 10
+POOL_CONNECTIONS = 32   # number of hosts kept in the connection pool
+POOL_MAXSIZE = 8        # keep-alive connections per host
+
+# Streaming extraction: read at most MAX_DOWNLOAD_BYTES and stop once max_length chars of text are found
+STREAMING_EXTRACTION = True
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 16 * 1024
+HTML_PARSER = "lxml"    # "lxml" when installed, otherwise the stdlib "html.parser"
+ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+SKIPPED_TAGS = {"script", "style", "noscript"}
+
+SCRAPE_CACHE_TTL = 6 * 3600            # seconds before a cached page is revalidated
+SCRAPE_CACHE_MAX_ENTRIES = 2000
+SCRAPE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+scrape_cache = DiskCache("scrape_cache", ttl=SCRAPE_CACHE_TTL,
+                         max_entries=SCRAPE_CACHE_MAX_ENTRIES, max_bytes=SCRAPE_CACHE_MAX_BYTES)
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Shared keep-alive session, so repeated fetches reuse pooled connections.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _http_session = session
+    return _http_session
+
+
+def extract_text(html: str, max_length: int = None) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove scripts and styles
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+
+    text = soup.get_text(separator="\n", strip=True)
+    text = "\n".join(line for line in text.splitlines() if line.strip())
+
+    return text[:max_length]  # Limit to avoid LLM overload
+
+
+class TextCollector:
+    """
+    Collects stripped text nodes outside script/style tags, like
+    BeautifulSoup's get_text(separator="\n", strip=True), until `max_length` chars.
+    """
+
+    def __init__(self, max_length: int = None):
+        self.max_length = max_length
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+        self.pending = []   # text node pieces; parsers may split one node across several calls
+
+    @property
+    def full(self) -> bool:
+        return self.max_length is not None and self.length >= self.max_length
+
+    def _flush(self):
+        text, self.pending = "".join(self.pending), []
+        for line in text.splitlines():
+            line = line.strip()
+            if line:
+                self.parts.append(line)
+                self.length += len(line) + 1
+
+    def start(self, tag, attrib=None):
+        self._flush()
+        if tag.lower() in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag.lower() in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth and not self.full:
+            self.pending.append(data)
+
+    def close(self):
+        self._flush()
+        return self.text()
 
-        # Remove scripts and styles
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
+    def text(self) -> str:
+        return "\n".join(self.parts)[:self.max_length]
 
-        text = soup.get_text(separator="\n", strip=True)
-        text = "\n".join(line for line in text.splitlines() if line.strip())
 
-        return text[:max_length]  # Limit to avoid LLM overload
+class _StdlibFeedParser(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def _feed_parser(collector, encoding):
+    """
+    Return feed(bytes) / close() callables for the configured parser backend.
+    """
+    if HTML_PARSER == "lxml":
+        try:
+            from lxml import etree
+            parser = etree.HTMLParser(target=collector, encoding=encoding)
+            return parser.feed, parser.close
+        except ImportError:
+            pass
+
+    parser = _StdlibFeedParser(collector)
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+
+    def feed(chunk):
+        parser.feed(decoder.decode(chunk))
+
+    def close():
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+
+    return feed, close
+
+
+def extract_streaming(response, max_length: int = None, cancel=None) -> tuple:
+    """
+    Extract text from a streamed response, reading at most MAX_DOWNLOAD_BYTES and stopping
+    as soon as `max_length` characters were collected. Returns (text, truncated_at), where
+    truncated_at is `max_length` if the text was cut there and None otherwise (a page cut
+    by the download cap would be cut the same way on every fetch). Raises Cancelled between chunks once `cancel` fires.
+    """
+    collector = TextCollector(max_length)
+    # requests assumes ISO-8859-1 for text/* without a charset; let the parser sniff instead
+    declared = "charset=" in response.headers.get("Content-Type", "").lower()
+    feed, close = _feed_parser(collector, response.encoding if declared else None)
+    downloaded = 0
+    truncated_at = None
+    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        if cancel is not None:
+            cancel.check()
+        downloaded += len(chunk)
+        feed(chunk)
+        if collector.full or downloaded >= MAX_DOWNLOAD_BYTES:
+            if collector.full:
+                truncated_at = max_length
+            break
+    else:
+        try:
+            close()
+        except Exception:
+            pass  # lxml raises on empty documents
+    collector.close()
+    return collector.text(), truncated_at
+
+
+def scrape_url(url: str, max_length: int = 4000, timeout: float = REQUEST_TIMEOUT,
+               use_cache: bool = True, cancel=None) -> str:
+    """
+    Return the cleaned text of a page. Cleaned text is cached on disk per URL;
+    expired entries are revalidated with ETag / Last-Modified before refetching.
+    A cancelled download (see `cancel`) returns "" and is not cached.
+    """
+    entry = scrape_cache.get_entry(url) if use_cache else None
+    truncated_at = entry.meta.get("truncated_at") if entry is not None else None
+    if truncated_at is not None and max_length > truncated_at:
+        entry = None  # cached text was cut at a shorter length than what is asked for now
+    if entry is not None and entry.fresh:
+        return entry.value[:max_length]
+
+    headers = {}
+    if entry is not None:
+        if entry.meta.get("etag"):
+            headers["If-None-Match"] = entry.meta["etag"]
+        if entry.meta.get("last_modified"):
+            headers["If-Modified-Since"] = entry.meta["last_modified"]
+
+    try:
+        with get_http_session().get(url, timeout=timeout, headers=headers,
+                                    stream=STREAMING_EXTRACTION) as response:
+            if entry is not None and response.status_code == 304:
+                scrape_cache.count("revalidated")
+                scrape_cache.refresh(url)
+                return entry.value[:max_length]
+
+            if STREAMING_EXTRACTION:
+                content_type = response.headers.get("Content-Type", "text/html").split(";")[0].strip().lower()
+                if content_type not in ALLOWED_CONTENT_TYPES:
+                    print(f"[scrape_url] Skipping {url}: unsupported content type {content_type}")
+                    return ""
+                with span("extract"):
+                    text, truncated_at = extract_streaming(response, max_length, cancel)
+            else:
+                html = response.text
+                with span("extract"):
+                    text, truncated_at = extract_text(html), None
+
+            if use_cache and response.ok and text:
+                scrape_cache.set(url, text, meta={
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "truncated_at": truncated_at,
+                })
+            return text[:max_length]
+    except Cancelled:
+        return ""
+    except requests.Timeout as e:
+        timeouts.inc(stage="fetch")
+        print(f"[scrape_url] Timed out fetching {url}: {e}")
+        return ""
     except Exception as e:
         print(f"[scrape_url] Failed to fetch {url}: {e}")
         return ""
 
 def extract_percentage(value: str) -> int:
-    # Remove any non-digit/decimal/percent characters
-    value = value.strip()
-
-    # Handle percentage values like '76.5%' or '00076.5%'
-    if "%" in value:
-        numeric = re.findall(r"[\d\.]+", value)
-        if numeric:
-            pct = float(numeric[0])
-        else:
-            pct = 0.0
+    """
+    Parse a confidence like '76.5%', '80' or '0.8' into an int from 0 to 100.
+    Numbers above 1 (or with a '%') are percentages; decimals up to 1 are fractions.
+    """
+    numeric = re.findall(r"\d+(?:\.\d+)?", value.strip())
+    if not numeric:
+        return 0
+    number = float(numeric[0])
+
+    if "%" in value or number > 1 or "." not in numeric[0]:
+        pct = number
     else:
         # Value like 0.25 (assume it's a fraction)
-        numeric = re.findall(r"[\d\.]+", value)
-        if numeric:
-            pct = float(numeric[0]) * 100
-        else:
-            pct = 0.0
+        pct = number * 100
 
     # Clamp between 0 and 100 and round
     pct = round(pct)
-    return max(0, min(pct, 100))
\ No newline at end of file
+    return max(0, min(pct, 100))
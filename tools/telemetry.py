@@ -0,0 +1,248 @@
+# tools/telemetry.py
+"""
+In-process metrics and per-request timing spans.
+
+Metrics are exposed in the Prometheus text format (see `render_metrics`, served at /metrics).
+A Trace collects the spans of one request, per source where it applies, and logs them as
+one JSON line when the request finishes.
+"""
+import bisect
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TRACE_LOG = True   # print each finished request trace as a JSON line
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def render(self) -> list:
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                                for key, v in items]
+
+
+class Gauge(_Metric):
+    """
+    A value read from `fn` at scrape time.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn):
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def render(self) -> list:
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"[telemetry] Could not read {self.name}: {e}")
+            return []
+        return self.header() + [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, fn) -> Gauge:
+        return self._register(Gauge(name, help_text, fn))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "factcheck_stage_seconds", "Time spent in each pipeline stage", ["stage"])
+stage_failures = registry.counter(
+    "factcheck_stage_failures_total", "Pipeline stages that raised an error", ["stage"])
+timeouts = registry.counter(
+    "factcheck_timeouts_total", "Operations abandoned because they ran out of time", ["stage"])
+cache_events = registry.counter(
+    "factcheck_cache_events_total", "Disk cache lookups and evictions", ["cache", "event"])
+llm_requests = registry.counter(
+    "factcheck_llm_requests_total", "LLM completions by how they were served", ["result"])
+llm_tokens = registry.counter(
+    "factcheck_llm_tokens_total", "Estimated LLM tokens sent (in) and generated (out)", ["direction"])
+llm_queue_wait = registry.histogram(
+    "factcheck_llm_queue_wait_seconds", "Time LLM calls waited for a generation slot", ["priority"])
+cancellations = registry.counter(
+    "factcheck_cancellations_total", "Requests cancelled before they finished", ["reason"])
+sources_skipped = registry.counter(
+    "factcheck_sources_skipped_total", "Sources left unjudged because the verdict was already settled")
+request_seconds = registry.histogram(
+    "factcheck_request_seconds", "End-to-end request latency", ["kind"])
+requests_total = registry.counter(
+    "factcheck_requests_total", "Finished requests by outcome", ["kind", "outcome"])
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+class Trace:
+    """
+    Timing spans of one request. Spans may be recorded from several threads.
+    """
+
+    def __init__(self, kind: str, request_id: str = None):
+        self.kind = kind
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.lock = threading.Lock()
+        self.finished = False
+
+    def add(self, stage: str, start: float, duration: float, status: str, source=None):
+        record = {"stage": stage, "start": round(start - self.started, 4),
+                  "duration": round(duration, 4), "status": status}
+        if source is not None:
+            record["source"] = source
+        with self.lock:
+            self.spans.append(record)
+
+    def span(self, stage: str, source=None):
+        return span(stage, trace=self, source=source)
+
+    def finish(self, outcome: str = "ok") -> dict:
+        """
+        Record the request in the metrics and log its spans. Later calls are ignored.
+        """
+        with self.lock:
+            if self.finished:
+                return None
+            self.finished = True
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        duration = time.perf_counter() - self.started
+        request_seconds.observe(duration, kind=self.kind)
+        requests_total.inc(kind=self.kind, outcome=outcome)
+        record = {"trace": self.request_id, "kind": self.kind, "outcome": outcome,
+                  "started_at": self.started_at, "duration": round(duration, 4), "spans": spans}
+        if TRACE_LOG:
+            print(json.dumps(record))
+        return record
+
+
+@contextmanager
+def span(stage: str, trace: Trace = None, source=None):
+    """
+    Time a block as `stage`: observed in factcheck_stage_seconds, counted as a failure if
+    it raises, and added to `trace` when one is given.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception as e:
+        from tools.cancel import Cancelled  # imported here, tools.cancel imports this module
+        status = "cancelled" if isinstance(e, Cancelled) else "error"
+        if status == "error":
+            stage_failures.inc(stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        stage_seconds.observe(duration, stage=stage)
+        if trace is not None:
+            trace.add(stage, start, duration, status, source)
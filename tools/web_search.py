@@ -1,12 +1,36 @@
+import os
+import re
 import requests
 
+from tools.disk_cache import DiskCache
+
 
-# os.getenv("SERPER_API_KEY")
 # export SERPER_API_KEY="key"
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 
 SEARCH_URL = "https://google.serper.dev/search"
 
-def google_search(query, num_results=5):
+SEARCH_CACHE_TTL = 24 * 3600   # seconds a cached result list stays valid
+SEARCH_CACHE_MAX_ENTRIES = 5000
+
+search_cache = DiskCache("search_cache", ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case-fold and collapse punctuation/whitespace, so trivially re-worded queries share a key.
+    """
+    query = re.sub(r"[^\w\s]", " ", query.casefold())
+    return " ".join(query.split())
+
+
+def google_search(query, num_results=5, use_cache=True):
+    cache_key = f"{num_results}:{normalize_query(query)}"
+    if use_cache:
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     headers = {"X-API-KEY": SERPER_API_KEY}
     payload = {"q": query}
 
@@ -21,4 +45,6 @@ def google_search(query, num_results=5):
             "snippet": item.get("snippet", "")
         })
 
+    if use_cache and results:
+        search_cache.set(cache_key, results)
     return results